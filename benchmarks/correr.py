@@ -0,0 +1,219 @@
+"""
+Benchmarks offline del pipeline de señales (sin red, con fixtures OHLCV).
+
+    python -m benchmarks.correr                               # 10 / 100 / 1000 tickers
+    python -m benchmarks.correr --tamanos 10 100 --repeticiones 5
+    python -m benchmarks.correr --grabadas cache/barras       # velas reales guardadas por AlmacenBarras
+    python -m benchmarks.correr --comparar A.json B.json      # B contra A, por benchmark y tamaño
+
+Cada corrida queda en benchmarks/resultados/<fecha>_<commit>.json.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+# Todo lo que escribe en disco va a un directorio temporal: el benchmark no toca la cache real
+_TEMPORAL = tempfile.mkdtemp(prefix="bench_cazador_")
+os.environ["CACHE_MODELOS"] = os.path.join(_TEMPORAL, "modelos")
+os.environ["CACHE_BARRAS"] = os.path.join(_TEMPORAL, "barras")
+os.environ["CACHE_NOTICIAS"] = os.path.join(_TEMPORAL, "noticias_rss.json")
+os.environ["BROKER_SIMULADO"] = "1"
+
+import numpy as np
+import pandas as pd
+import sklearn
+import src.data_loader as data_loader
+import src.scanner as scanner
+import src.strategy as strategy
+from src.data_loader import calcular_indicadores
+from src.indicadores import indicadores_panel
+from src.features import preparar_datos
+from src.registro_modelos import RegistroModelos
+from benchmarks.fixtures import ProveedorFixtures, universo_sintetico
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+TAMANOS = (10, 100, 1000)
+BENCHMARKS = ("filtro_scanner", "indicadores_ticker", "indicadores_lote", "preparar_datos",
+              "examinar_activo_entrenando", "examinar_activo_cache", "cazador")
+UMBRAL_REGRESION = 1.10  # mediana un 10% más lenta se marca en --comparar
+
+
+def _estadisticas(tiempos, tickers):
+    return {
+        "tickers": tickers,
+        "repeticiones": len(tiempos),
+        "primera": tiempos[0],
+        "min": min(tiempos),
+        "mediana": statistics.median(tiempos),
+        "media": statistics.fmean(tiempos),
+        "por_ticker": statistics.median(tiempos) / tickers if tickers else None,
+    }
+
+
+async def _medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        if asyncio.iscoroutine(resultado): await resultado
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+class CanalFalso:
+    def __init__(self, id):
+        self.id = id
+        self.mensajes = 0
+
+    async def send(self, *args, **kwargs):
+        self.mensajes += 1
+
+
+def _preparar_cazador(tickers):
+    """Importa main con el universo sintético, canales falsos y sin LLM. Devuelve el módulo."""
+    import main
+    import src.brain as brain
+    import src.notifications as notifications
+
+    brain.client = None  # resúmenes por plantilla
+    notifications.INTERVALO_DISCORD = 0.0
+    notifications.despachador.ventana = 0.0
+    canales = {}
+    main.client.get_channel = lambda id: canales.setdefault(id, CanalFalso(id))
+
+    tercio = max(1, len(tickers) // 3)
+    scanner.UNIVERSO.update({"FOREX": tickers[:tercio], "CRIPTO": tickers[tercio:2 * tercio], "ACCIONES": tickers[2 * tercio:]})
+    return main
+
+
+async def correr_tamano(n, repeticiones, proveedor, max_modelos, seleccion):
+    tickers = proveedor.tickers_grabados()[:n] or universo_sintetico(n)
+    n = len(tickers)
+    crudas = proveedor.barras(tickers, "15m")
+    resultados = {}
+
+    if "filtro_scanner" in seleccion:
+        scanner.UNIVERSO["BENCH"] = tickers
+        tiempos = await _medir(lambda: scanner.escanear_mercado("BENCH", "SCALPING", devolver_panel=True), repeticiones)
+        resultados["filtro_scanner"] = _estadisticas(tiempos, n)
+
+    if "indicadores_ticker" in seleccion:
+        # El bloque de indicadores de descargar_datos, ticker por ticker
+        tiempos = await _medir(lambda: [calcular_indicadores(df.copy()) for df in crudas.values()], repeticiones)
+        resultados["indicadores_ticker"] = _estadisticas(tiempos, n)
+
+    if "indicadores_lote" in seleccion:
+        tiempos = await _medir(lambda: indicadores_panel(crudas), repeticiones)
+        resultados["indicadores_lote"] = _estadisticas(tiempos, n)
+
+    if "preparar_datos" in seleccion:
+        tiempos = await _medir(lambda: [preparar_datos(df) for df in crudas.values()], repeticiones)
+        resultados["preparar_datos"] = _estadisticas(tiempos, n)
+
+    if {"examinar_activo_entrenando", "examinar_activo_cache"} & set(seleccion):
+        # Ajustar el RandomForest domina: se mide sobre una muestra de max_modelos tickers
+        muestra = {t: calcular_indicadores(crudas[t].copy()) for t in tickers[:max_modelos]}
+
+        def examinar_todos():
+            for t, df in muestra.items(): strategy.examinar_activo(df.copy(), t, "SCALPING")
+
+        def entrenando():
+            # Directorio nuevo en cada corrida: el registro no puede recuperar modelos del disco
+            strategy.registro = RegistroModelos(directorio=tempfile.mkdtemp(dir=_TEMPORAL), capacidad=len(muestra) + 1)
+            examinar_todos()
+
+        if "examinar_activo_entrenando" in seleccion:
+            resultados["examinar_activo_entrenando"] = _estadisticas(await _medir(entrenando, repeticiones), len(muestra))
+        if "examinar_activo_cache" in seleccion:
+            if "examinar_activo_entrenando" not in seleccion: entrenando()
+            resultados["examinar_activo_cache"] = _estadisticas(await _medir(examinar_todos, repeticiones), len(muestra))
+
+    if "cazador" in seleccion:
+        main = _preparar_cazador(tickers)
+        tiempos = await _medir(main.cazador_automatico.coro, repeticiones)
+        await main.despachador.vaciar()
+        resultados["cazador"] = _estadisticas(tiempos, n)
+
+    return resultados
+
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "sin-git"
+
+
+def correr(tamanos=TAMANOS, repeticiones=3, grabadas=None, max_modelos=25, seleccion=BENCHMARKS, semilla=7):
+    proveedor = ProveedorFixtures(semilla=semilla, grabadas=grabadas)
+    # Toda la capa de datos sale de las fixtures
+    data_loader.obtener_barras = proveedor.obtener_barras
+    scanner.obtener_barras = proveedor.obtener_barras
+
+    async def todo():
+        salida = {}
+        for n in tamanos:
+            print(f"⏱️ {n} tickers...")
+            salida[str(n)] = await correr_tamano(n, repeticiones, proveedor, max_modelos, seleccion)
+            for nombre, e in salida[str(n)].items():
+                print(f"   {nombre:<28} mediana {e['mediana']:.4f}s  ({e['tickers']} tickers)")
+        return salida
+
+    return {
+        "commit": _commit(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entorno": {
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "sklearn": sklearn.__version__, "cpus": os.cpu_count(), "plataforma": platform.platform(),
+        },
+        "parametros": {"repeticiones": repeticiones, "max_modelos": max_modelos, "semilla": semilla,
+                       "fixtures": grabadas or "sinteticas"},
+        "resultados": asyncio.run(todo()),
+    }
+
+
+def guardar(resultado, directorio=DIRECTORIO_RESULTADOS):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"{resultado['fecha'].replace(':', '')}_{resultado['commit']}.json")
+    with open(ruta, "w", encoding="utf-8") as f: json.dump(resultado, f, indent=1)
+    return ruta
+
+
+def comparar(ruta_base, ruta_nueva):
+    """Tabla de medianas (base vs nueva). Devuelve True si alguna empeoró más de UMBRAL_REGRESION."""
+    with open(ruta_base, encoding="utf-8") as f: base = json.load(f)
+    with open(ruta_nueva, encoding="utf-8") as f: nueva = json.load(f)
+    print(f"{'benchmark':<28} {'tickers':>7} {base['commit']:>10} {nueva['commit']:>10}   razón")
+    regresion = False
+    for tamano, filas in nueva["resultados"].items():
+        for nombre, e in filas.items():
+            anterior = base["resultados"].get(tamano, {}).get(nombre)
+            if not anterior: continue
+            razon = e["mediana"] / anterior["mediana"] if anterior["mediana"] else float("nan")
+            marca = " ⚠️" if razon > UMBRAL_REGRESION else ""
+            regresion |= razon > UMBRAL_REGRESION
+            print(f"{nombre:<28} {tamano:>7} {anterior['mediana']:>9.4f}s {e['mediana']:>9.4f}s   {razon:.2f}x{marca}")
+    return regresion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks offline del pipeline de señales")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--grabadas", help="directorio de AlmacenBarras con velas reales (ej. cache/barras)")
+    parser.add_argument("--max-modelos", type=int, default=25, help="tickers usados en examinar_activo")
+    parser.add_argument("--solo", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVA"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar) else 0)
+    resultado = correr(args.tamanos, args.repeticiones, args.grabadas, args.max_modelos, args.solo)
+    print(f"💾 Resultados en {guardar(resultado)}")
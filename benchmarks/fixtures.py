@@ -0,0 +1,68 @@
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from src.almacen_barras import COLUMNAS_OHLCV
+
+# --- FIXTURES OHLCV PARA BENCHMARKS ---
+# Velas sintéticas (caminata aleatoria geométrica, reproducible por semilla) o velas
+# reales grabadas por AlmacenBarras (<directorio>/<intervalo>/<ticker>.parquet).
+# Nada de esto toca la red.
+
+FIN_FIXTURES = pd.Timestamp("2024-06-28 20:00", tz="UTC")
+# intervalo -> (frecuencia pandas, velas, volatilidad por vela)
+FORMA_INTERVALO = {
+    "15m": ("15min", 480, 0.002),
+    "1h": ("h", 960, 0.004),
+    "1d": ("B", 126, 0.015),
+}
+
+
+def universo_sintetico(n):
+    return [f"SIM{i:04d}" for i in range(n)]
+
+
+def generar_velas(ticker, intervalo, semilla=7):
+    frecuencia, velas, sigma = FORMA_INTERVALO[intervalo]
+    azar = np.random.default_rng([semilla, zlib.crc32(ticker.encode())])
+    retornos = azar.normal(0, sigma, velas)
+    close = 100 * np.exp(np.cumsum(retornos)) * azar.uniform(0.5, 5)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    rango = np.abs(azar.normal(0, sigma, velas)) * close
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + rango,
+        'Low': np.minimum(open_, close) - rango,
+        'Close': close,
+        'Volume': azar.integers(1_000, 1_000_000, velas).astype(float),
+    }, index=pd.date_range(end=FIN_FIXTURES, periods=velas, freq=frecuencia))
+
+
+class ProveedorFixtures:
+    """Reemplazo de data_loader.obtener_barras que sirve las fixtures en memoria."""
+    def __init__(self, semilla=7, grabadas=None):
+        self.semilla = semilla
+        self.grabadas = grabadas
+        self._velas = {}  # (ticker, intervalo) -> DataFrame
+
+    def tickers_grabados(self, intervalo="15m"):
+        if not self.grabadas: return []
+        carpeta = os.path.join(self.grabadas, intervalo)
+        if not os.path.isdir(carpeta): return []
+        return sorted(os.path.splitext(f)[0] for f in os.listdir(carpeta) if f.endswith(".parquet"))
+
+    def velas(self, ticker, intervalo):
+        clave = (ticker, intervalo)
+        if clave not in self._velas:
+            ruta = os.path.join(self.grabadas, intervalo, f"{ticker}.parquet") if self.grabadas else None
+            if ruta and os.path.exists(ruta):
+                self._velas[clave] = pd.read_parquet(ruta)[COLUMNAS_OHLCV]
+            else:
+                self._velas[clave] = generar_velas(ticker, intervalo, self.semilla)
+        return self._velas[clave]
+
+    def barras(self, tickers, intervalo):
+        return {t: self.velas(t, intervalo) for t in tickers}
+
+    async def obtener_barras(self, tickers, periodo, intervalo):
+        return self.barras(tickers, intervalo)
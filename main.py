@@ -1,19 +1,22 @@
 import os
 import asyncio
+import time
 import traceback
 import re
-import urllib.request
-import xml.etree.ElementTree as ET
 import discord
 from discord.ext import tasks
 from discord.ui import Button, View
 from dotenv import load_dotenv
-import ccxt
 
-from src.data_loader import descargar_datos 
-from src.strategy import examinar_activo
-from src.brain import interpretar_intencion, generar_resumen_humano
-from src.scanner import escanear_mercado
+from src.data_loader import descargar_datos, descargar_lote, almacen
+from src.motor_evaluacion import evaluar_uno, MAX_PROCESOS
+from src.brain import interpretar_intencion_async, resumir_senales
+from src.scanner import escanear_mercado, k_por_presupuesto
+from src.execution import BrokerAsync, ExchangeSimulado
+from src.notifications import despachador
+from src.noticias_rss import LectorRSS
+from src.metricas import metricas
+from src.instrumentos import metadatos, TICK_SIZE
 
 load_dotenv()
 
@@ -24,7 +27,6 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 # ==========================================================
 LOTAJE_ACTUAL = 0.01
 rondas_vacias = {"FOREX": 0, "CRIPTO": 0, "ACCIONES": 0}
-noticias_enviadas = set()
 
 # ==========================================================
 # 🏢 MAPA DEL CUARTEL GENERAL (TUS CANALES)
@@ -43,42 +45,64 @@ CANALES_ALERTAS = {
 OKX_API_KEY = os.getenv("OKX_API_KEY")
 OKX_API_SECRET = os.getenv("OKX_API_SECRET")
 OKX_PASSWORD = os.getenv("OKX_PASSWORD")
+# BROKER_SIMULADO=1 reemplaza OKX por el exchange local (sin red), llenando contra las velas en caché
+BROKER_SIMULADO = os.getenv("BROKER_SIMULADO") == "1"
+
+def velas_simulador(symbol):
+    # El broker habla en sus símbolos (BTC/USDT); el almacén guarda por ticker (BTC-USD)
+    ticker = metadatos.ticker_de(symbol)
+    return almacen.leer(ticker, "15m") if ticker else None
 
 try:
-    broker = ccxt.okx({
-        'apiKey': OKX_API_KEY,
-        'secret': OKX_API_SECRET,
-        'password': OKX_PASSWORD,
-        'enableRateLimit': True,
-    })
-    broker.set_sandbox_mode(True) 
-    print("✅ Conexión a OKX Demo ESTABLECIDA.")
+    if BROKER_SIMULADO:
+        simulador = ExchangeSimulado(
+            latencia=float(os.getenv("SIM_LATENCIA", "0.05")),
+            slippage_bps=float(os.getenv("SIM_SLIPPAGE_BPS", "2")),
+            proveedor_velas=velas_simulador,
+        )
+        broker = BrokerAsync(simulador)
+        print("🧪 Broker SIMULADO activo (paper trading local).")
+    else:
+        # Cliente asíncrono: la sesión y los mercados se reutilizan entre órdenes
+        broker = BrokerAsync.okx(OKX_API_KEY, OKX_API_SECRET, OKX_PASSWORD, sandbox=True)
+        print("✅ Conexión a OKX Demo ESTABLECIDA.")
 except Exception as e:
     print(f"❌ Error al conectar con OKX: {e}")
     broker = None
 
+class ClienteCazador(discord.Client):
+    async def close(self):
+        # Al apagar: cerrar las sesiones HTTP del broker y del despachador antes que la de Discord
+        if broker:
+            try: await broker.cerrar()
+            except Exception as e: print(f"⚠️ Error cerrando la sesión del broker: {e}")
+        await despachador.cerrar()
+        await super().close()
+
 intents = discord.Intents.default()
 intents.message_content = True
-client = discord.Client(intents=intents)
+client = ClienteCazador(intents=intents)
 
 # ==========================================================
 # 🎛️ INTERFAZ DE USUARIO: BOTONES INTERACTIVOS
 # ==========================================================
+def precio_de(info, campo):
+    """Precio de la señal con los decimales del instrumento (solo para mostrar)."""
+    return metadatos.formatear_precio(info.get('simbolo'), info[campo])
+
 class BotonesTrading(View):
     def __init__(self, ticker, tipo_operacion, precio, tp, sl):
         super().__init__(timeout=None)
         self.ticker = ticker
         self.tipo_operacion = tipo_operacion
+        self.precio, self.tp, self.sl = precio, tp, sl
         
-        # Limpiamos las comas del texto antes de convertir a decimales
-        self.precio = float(str(precio).replace(',', ''))
-        self.tp = float(str(tp).replace(',', ''))
-        self.sl = float(str(sl).replace(',', ''))
-        
-        ticker_limpio = self.ticker.replace("-", "")
-        self.simbolo_broker = ticker_limpio.replace("USD", "/USDT")
+        # Símbolo del broker desde los metadatos precargados (None = no se opera)
+        self.simbolo_broker = metadatos.simbolo_broker(ticker)
         
-        if "LONG" in tipo_operacion or "COMPRA" in tipo_operacion:
+        if not self.simbolo_broker:
+            self.add_item(Button(label="🚫 No disponible en el broker", style=discord.ButtonStyle.secondary, disabled=True))
+        elif "LONG" in tipo_operacion or "COMPRA" in tipo_operacion:
             btn = Button(label=f"🟢 COMPRAR {LOTAJE_ACTUAL} lotes", style=discord.ButtonStyle.success)
             btn.callback = self.ejecutar_compra
             self.add_item(btn)
@@ -93,6 +117,7 @@ class BotonesTrading(View):
     async def ejecutar_venta(self, interaction: discord.Interaction):
         await self.enviar_orden(interaction, 'sell')
 
+    @metricas.medir("enviar_orden")
     async def enviar_orden(self, interaction: discord.Interaction, side: str):
         if not broker:
             await interaction.response.send_message("❌ Error: API de OKX no configurada.", ephemeral=True)
@@ -101,33 +126,39 @@ class BotonesTrading(View):
         await interaction.response.defer(ephemeral=True) 
 
         try:
-            costo_usdt = float(LOTAJE_ACTUAL) * self.precio
-            ganancia_usdt = abs(self.tp - self.precio) * float(LOTAJE_ACTUAL)
-            riesgo_usdt = abs(self.precio - self.sl) * float(LOTAJE_ACTUAL)
+            # TP/SL al tick y lote al paso del mercado: el broker rechaza valores fuera de grilla
+            tp = metadatos.redondear_precio(self.ticker, self.tp)
+            sl = metadatos.redondear_precio(self.ticker, self.sl)
+            lote = metadatos.ajustar_cantidad(self.ticker, float(LOTAJE_ACTUAL))
+
+            costo_usdt = lote * self.precio
+            ganancia_usdt = abs(tp - self.precio) * lote
+            riesgo_usdt = abs(self.precio - sl) * lote
 
             parametros_extra = {
-                'takeProfit': {'triggerPrice': self.tp},
-                'stopLoss': {'triggerPrice': self.sl}
+                'takeProfit': {'triggerPrice': tp},
+                'stopLoss': {'triggerPrice': sl}
             }
 
-            orden = broker.create_market_order(
+            orden = await broker.crear_orden_mercado(
                 symbol=self.simbolo_broker, 
                 side=side, 
-                amount=LOTAJE_ACTUAL,
+                amount=lote,
                 params=parametros_extra
             )
             
             precio_ejecutado = orden.get('average', orden.get('price', self.precio))
             if precio_ejecutado is None: precio_ejecutado = self.precio
+            formato = lambda valor: metadatos.formatear_precio(self.ticker, valor)
 
             msg_exito = (
                 f"✅ **¡ORDEN ENVIADA A OKX!**\n"
                 f"💎 **Activo:** `{self.simbolo_broker}` | **Tipo:** `{'COMPRA' if side == 'buy' else 'VENTA'}`\n"
                 f"💸 **Costo Aprox:** `${costo_usdt:.2f} USD`\n"
-                f"⚖️ **Lote:** `{LOTAJE_ACTUAL}` | 💵 **Entrada:** `${precio_ejecutado}`\n"
+                f"⚖️ **Lote:** `{lote}` | 💵 **Entrada:** `${formato(precio_ejecutado)}`\n"
                 f"---\n"
-                f"🎯 **TP:** `${self.tp}` _(+${ganancia_usdt:.2f})_\n"
-                f"⛔ **SL:** `${self.sl}` _(-${riesgo_usdt:.2f})_\n"
+                f"🎯 **TP:** `${formato(tp)}` _(+${ganancia_usdt:.2f})_\n"
+                f"⛔ **SL:** `${formato(sl)}` _(-${riesgo_usdt:.2f})_\n"
                 f"---\n"
                 f"🆔 **ID:** `{orden.get('id', 'N/A')}`\n"
             )
@@ -138,10 +169,13 @@ class BotonesTrading(View):
 # ==========================================================
 # 🧠 LÓGICA DE ANÁLISIS
 # ==========================================================
-async def analizar_activo_completo(ticker, estilo, categoria):
-    df, backup_mode = await descargar_datos(ticker, estilo)
+async def analizar_activo_completo(ticker, estilo, categoria, df=None):
+    # Si el lote del scanner ya trae los datos, no se vuelve a descargar
+    backup_mode = False
+    if df is None:
+        df, backup_mode = await descargar_datos(ticker, estilo)
     if df is None or df.empty: return None, 0.0
-    info, prob = examinar_activo(df, ticker, estilo, categoria)
+    info, prob = await evaluar_uno(ticker, df, estilo, categoria)
     if info:
         info['backup'] = backup_mode
         return info, prob
@@ -150,6 +184,14 @@ async def analizar_activo_completo(ticker, estilo, categoria):
 @client.event
 async def on_ready():
     print(f"🤖 CAZADOR FX CONECTADO COMO: {client.user}")
+    if broker:
+        try:
+            mercados = await broker.conectar()
+            modo = getattr(broker.exchange, 'precisionMode', TICK_SIZE)
+            print(f"📐 Metadatos de {metadatos.cargar_mercados(mercados, modo)} instrumentos actualizados")
+        except Exception as e: print(f"⚠️ No se pudieron precargar los mercados de OKX (se usa la foto local): {e}")
+    try: await metricas.iniciar()
+    except Exception as e: print(f"⚠️ No se pudo publicar las métricas: {e}")
     if not cazador_automatico.is_running():
         cazador_automatico.start()
     if not noticiero_automatico.is_running():
@@ -190,11 +232,13 @@ async def on_message(message):
         hay = False
         
         for c in ["CRIPTO", "FOREX", "ACCIONES"]:
-            try: candidatos = await escanear_mercado(c, "SCALPING")
-            except: candidatos = []
+            try:
+                candidatos, panel = await escanear_mercado(c, "SCALPING", devolver_panel=True)
+                lote = await descargar_lote(candidatos, "SCALPING", panel)
+            except: candidatos, lote = [], {}
             for t in candidatos:
                 try:
-                    info, prob = await analizar_activo_completo(t, "SCALPING", c)
+                    info, prob = await analizar_activo_completo(t, "SCALPING", c, lote.get(t))
                     if info:
                         hay = True
                         tipo_real = info.get('tipo_operacion', info.get('veredicto', 'NEUTRAL'))
@@ -205,12 +249,12 @@ async def on_message(message):
                             description=f"Estado: **{tipo_real}** (Fuerza: {prob}%)\n🤖 IA: _{info.get('motivo', 'Análisis crudo')}_",
                             color=color
                         )
-                        embed.add_field(name="Entrada", value=f"`${info['precio']}`")
-                        embed.add_field(name="TP", value=f"`${info['tp']}`")
-                        embed.add_field(name="SL", value=f"`${info['sl']}`")
+                        embed.add_field(name="Entrada", value=f"`${precio_de(info, 'precio')}`")
+                        embed.add_field(name="TP", value=f"`${precio_de(info, 'tp')}`")
+                        embed.add_field(name="SL", value=f"`${precio_de(info, 'sl')}`")
                         
                         tipo_btn = "COMPRA" if "NEUTRAL" in tipo_real else tipo_real
-                        vista = BotonesTrading(info['ticker'], tipo_btn, info['precio'], info['tp'], info['sl'])
+                        vista = BotonesTrading(info['simbolo'], tipo_btn, info['precio'], info['tp'], info['sl'])
                         await message.channel.send(embed=embed, view=vista)
                 except: continue 
         
@@ -220,7 +264,7 @@ async def on_message(message):
 
     # FLUJO NORMAL (Manual)
     try:
-        data = interpretar_intencion(texto)
+        data = await interpretar_intencion_async(texto)
         acc = data.get("accion", "CHARLA")
         tick = data.get("ticker")
         est = data.get("estilo", "SCALPING")
@@ -233,11 +277,13 @@ async def on_message(message):
             
             hay = False
             for c in cats:
-                try: candidatos = await escanear_mercado(c, est)
-                except: candidatos = []
+                try:
+                    candidatos, panel = await escanear_mercado(c, est, devolver_panel=True)
+                    lote = await descargar_lote(candidatos, est, panel)
+                except: candidatos, lote = [], {}
                 for t in candidatos:
                     try:
-                        info, prob = await analizar_activo_completo(t, est, c)
+                        info, prob = await analizar_activo_completo(t, est, c, lote.get(t))
                         if info and info['tipo_operacion'] != "NEUTRAL" and prob >= 40:
                             hay = True
                             tipo = info['tipo_operacion']
@@ -246,11 +292,11 @@ async def on_message(message):
                                 description=f"💎 **{info['ticker']}** ➔ **{tipo}**\n💪 Fuerza: {prob}%",
                                 color=discord.Color.green() if "LONG" in tipo else discord.Color.red()
                             )
-                            embed.add_field(name="Entrada", value=f"`${info['precio']}`")
-                            embed.add_field(name="TP", value=f"`${info['tp']}`")
-                            embed.add_field(name="SL", value=f"`${info['sl']}`")
+                            embed.add_field(name="Entrada", value=f"`${precio_de(info, 'precio')}`")
+                            embed.add_field(name="TP", value=f"`${precio_de(info, 'tp')}`")
+                            embed.add_field(name="SL", value=f"`${precio_de(info, 'sl')}`")
                             
-                            vista = BotonesTrading(info['ticker'], tipo, info['precio'], info['tp'], info['sl'])
+                            vista = BotonesTrading(info['simbolo'], tipo, info['precio'], info['tp'], info['sl'])
                             
                             await message.channel.send(embed=embed, view=vista)
                     except: continue 
@@ -269,13 +315,13 @@ async def on_message(message):
                     description=f"👉 **{tipo}**\n🤖 IA: _{info.get('motivo', '...')}_",
                     color=color
                 )
-                embed.add_field(name="Precio", value=f"`${info['precio']}`")
-                embed.add_field(name="TP", value=f"`${info['tp']}`")
-                embed.add_field(name="SL", value=f"`${info['sl']}`")
+                embed.add_field(name="Precio", value=f"`${precio_de(info, 'precio')}`")
+                embed.add_field(name="TP", value=f"`${precio_de(info, 'tp')}`")
+                embed.add_field(name="SL", value=f"`${precio_de(info, 'sl')}`")
 
                 await msg_espera.delete()
                 if "NEUTRAL" not in tipo:
-                    vista = BotonesTrading(info['ticker'], tipo, info['precio'], info['tp'], info['sl'])
+                    vista = BotonesTrading(info['simbolo'], tipo, info['precio'], info['tp'], info['sl'])
                     await message.channel.send(embed=embed, view=vista)
                 else:
                     await message.channel.send(embed=embed)
@@ -292,48 +338,141 @@ async def on_message(message):
 # ==========================================================
 # 🎯 RUTINAS AUTOMÁTICAS (CAZADOR Y NOTICIERO)
 # ==========================================================
+# Límite global de escaneos (categoría × estilo) simultáneos y tamaño de las colas del radar
+MAX_TAREAS_RADAR = int(os.getenv("MAX_TAREAS_RADAR", "3"))
+TAMANO_COLA_RADAR = int(os.getenv("TAMANO_COLA_RADAR", "32"))
+# Las señales que llegan dentro de esta ventana se resumen juntas en una sola petición al LLM
+VENTANA_RESUMENES = float(os.getenv("VENTANA_RESUMENES", "1.5"))
+# Segundos de cada ronda para evaluar candidatos: de aquí sale cuántos pasan el prefiltro
+PRESUPUESTO_RADAR = float(os.getenv("PRESUPUESTO_RADAR", "600"))
+
+def embed_radar(info, prob, estilo):
+    tipo = info.get('tipo_operacion', 'NEUTRAL')
+    color = discord.Color.green() if "LONG" in tipo or "COMPRA" in tipo else discord.Color.red()
+    embed = discord.Embed(
+        title=f"🤖 Radar Automático ({estilo})",
+        description=f"💎 **{info['ticker']}** ➔ **{tipo}**\n💪 **Fuerza: {prob}%**",
+        color=color
+    )
+    embed.add_field(name="💰 Entrada", value=f"`${precio_de(info, 'precio')}`", inline=True)
+    embed.add_field(name="🎯 TP", value=f"`${precio_de(info, 'tp')}`", inline=True)
+    embed.add_field(name="⛔ SL", value=f"`${precio_de(info, 'sl')}`", inline=True)
+    embed.add_field(name="📝 Análisis", value=f"_{info.get('motivo', '')}_", inline=False)
+    if info.get('resumen'):
+        embed.add_field(name="🧠 IA", value=f"_{info['resumen']}_", inline=False)
+    return embed
+
 @tasks.loop(minutes=30)
+@metricas.medir("cazador")
 async def cazador_automatico():
     categorias_a_escanear = ["FOREX", "CRIPTO", "ACCIONES"]
     estilos = ["SCALPING", "SWING"]
     global rondas_vacias
     
+    canales = {}
     for cat in categorias_a_escanear:
         canal_id = CANALES_ALERTAS.get(cat)
         if not canal_id: continue
         channel = client.get_channel(canal_id)
         if not channel: continue 
-
-        hubo_senal_en_categoria = False
-
-        for estilo in estilos:
-            try:
-                candidatos = await escanear_mercado(cat, estilo)
-                for t in candidatos:
-                    info, prob = await analizar_activo_completo(t, estilo, cat)
-                    if info:
-                        tipo = info.get('tipo_operacion', 'NEUTRAL')
-                        if tipo == "NEUTRAL" or prob < 40: continue
-
-                        hubo_senal_en_categoria = True
-                        color = discord.Color.green() if "LONG" in tipo or "COMPRA" in tipo else discord.Color.red()
-                        embed = discord.Embed(
-                            title=f"🤖 Radar Automático ({estilo})",
-                            description=f"💎 **{info['ticker']}** ➔ **{tipo}**\n💪 **Fuerza: {prob}%**",
-                            color=color
-                        )
-                        embed.add_field(name="💰 Entrada", value=f"`${info['precio']}`", inline=True)
-                        embed.add_field(name="🎯 TP", value=f"`${info['tp']}`", inline=True)
-                        embed.add_field(name="⛔ SL", value=f"`${info['sl']}`", inline=True)
-                        embed.add_field(name="📝 Análisis", value=f"_{info.get('motivo', '')}_", inline=False)
-
-                        vista = BotonesTrading(info['ticker'], tipo, info['precio'], info['tp'], info['sl'])
-                        try: await channel.send(embed=embed, view=vista)
-                        except Exception: pass
-            except Exception: pass
-        
+        canales[cat] = channel
+
+    # Pipeline: DESCARGA -> EVALUACIÓN -> RESUMEN, unidas por colas acotadas. La publicación
+    # va al despachador de notificaciones: Discord ya no frena la generación de señales.
+    cola_trabajos = asyncio.Queue(maxsize=TAMANO_COLA_RADAR)
+    cola_senales = asyncio.Queue(maxsize=TAMANO_COLA_RADAR)
+    limite = asyncio.Semaphore(MAX_TAREAS_RADAR)
+    senales_por_categoria = {cat: False for cat in canales}
+    tiempos = {}  # etapa -> (primer inicio, último fin)
+    fin_presupuesto = time.perf_counter() + PRESUPUESTO_RADAR
+    escaneos_pendientes = len(canales) * len(estilos)
+
+    def marcar(etapa, inicio):
+        primero, _ = tiempos.get(etapa, (inicio, inicio))
+        tiempos[etapa] = (min(primero, inicio), time.perf_counter())
+
+    async def etapa_descarga(cat, estilo):
+        nonlocal escaneos_pendientes
+        inicio = time.perf_counter()
+        try:
+            async with limite:
+                # El tiempo que queda se reparte entre los escaneos que faltan
+                k = k_por_presupuesto(max(0.0, fin_presupuesto - time.perf_counter()) / escaneos_pendientes, MAX_PROCESOS)
+                escaneos_pendientes -= 1
+                candidatos, panel = await escanear_mercado(cat, estilo, devolver_panel=True, k=k)
+                lote = await descargar_lote(candidatos, estilo, panel)
+        except Exception:
+            return
+        finally:
+            marcar("descarga", inicio)
+        for t in candidatos:
+            if t in lote: await cola_trabajos.put((t, lote[t], estilo, cat))
+
+    async def etapa_evaluacion():
+        while True:
+            trabajo = await cola_trabajos.get()
+            if trabajo is None: break
+            ticker, df, estilo, cat = trabajo
+            inicio = time.perf_counter()
+            try: info, prob = await evaluar_uno(ticker, df, estilo, cat)
+            except Exception: info, prob = None, 0.0
+            marcar("evaluacion", inicio)
+
+            if not info: continue
+            tipo = info.get('tipo_operacion', 'NEUTRAL')
+            if tipo == "NEUTRAL" or prob < 40: continue
+            senales_por_categoria[cat] = True
+            await cola_senales.put((info, prob, estilo, cat))
+
+    async def etapa_resumen():
+        # Junta las señales que llegan en VENTANA_RESUMENES y las resume en lote
+        terminado = False
+        while not terminado:
+            primera = await cola_senales.get()
+            if primera is None: break
+            lote = [primera]
+            limite_espera = time.perf_counter() + VENTANA_RESUMENES
+            while len(lote) < TAMANO_COLA_RADAR:
+                restante = limite_espera - time.perf_counter()
+                if restante <= 0: break
+                try: senal = await asyncio.wait_for(cola_senales.get(), timeout=restante)
+                except asyncio.TimeoutError: break
+                if senal is None:
+                    terminado = True
+                    break
+                lote.append(senal)
+
+            inicio = time.perf_counter()
+            resumenes = await resumir_senales([(info, prob) for info, prob, _, _ in lote])
+            marcar("resumen", inicio)
+            for (info, prob, estilo, cat), resumen in zip(lote, resumenes):
+                info['resumen'] = resumen
+                inicio = time.perf_counter()
+                try:
+                    tipo = info.get('tipo_operacion', 'NEUTRAL')
+                    vista = BotonesTrading(info['simbolo'], tipo, info['precio'], info['tp'], info['sl'])
+                    await despachador.discord(canales[cat], embed_radar(info, prob, estilo), vista, etiqueta=info['ticker'])
+                except Exception: pass
+                marcar("publicacion", inicio)
+
+    inicio_ronda = time.perf_counter()
+    resumidor = asyncio.create_task(etapa_resumen())
+    evaluadores = [asyncio.create_task(etapa_evaluacion()) for _ in range(MAX_PROCESOS)]
+
+    await asyncio.gather(*(etapa_descarga(cat, estilo) for cat in canales for estilo in estilos))
+    for _ in evaluadores: await cola_trabajos.put(None)
+    await asyncio.gather(*evaluadores)
+    await cola_senales.put(None)
+    await resumidor
+
+    for etapa, (ini, fin) in tiempos.items():
+        metricas.observar("radar_etapa_segundos", fin - ini, etapa=etapa)
+    resumen = " | ".join(f"{etapa}: {fin - ini:.1f}s" for etapa, (ini, fin) in tiempos.items())
+    print(f"⏱️ Radar completado en {time.perf_counter() - inicio_ronda:.1f}s ({resumen or 'sin trabajo'})")
+
+    for cat, channel in canales.items():
         # Lógica del Heartbeat (Reporte de inactividad cada hora = 2 ciclos de 30 min)
-        if hubo_senal_en_categoria:
+        if senales_por_categoria[cat]:
             rondas_vacias[cat] = 0
         else:
             rondas_vacias[cat] += 1
@@ -343,8 +482,7 @@ async def cazador_automatico():
                     description=f"En la última hora no he detectado tendencias seguras en el mercado de **{cat}**. He filtrado el ruido para proteger el capital. Sigo monitoreando... 🦉",
                     color=discord.Color.dark_gray()
                 )
-                try: await channel.send(embed=embed_vacio)
-                except: pass
+                await despachador.discord(channel, embed_vacio)
                 rondas_vacias[cat] = 0
 
 @cazador_automatico.before_loop
@@ -352,7 +490,13 @@ async def before_cazador():
     await client.wait_until_ready()
 
 # --- NUEVO: MOTOR DE NOTICIAS (VERSIÓN ANTI-SPAM) ---
-@tasks.loop(hours=1)
+# 🌐 Agregador Institucional (Reuters, Bloomberg, CNBC, etc.). Con GET condicional y
+# corte en el primer item visto, sondear cada pocos minutos cuesta casi lo mismo que cada hora.
+lector_noticias = LectorRSS("https://feeds.finance.yahoo.com/rss/2.0/headline?s=SPY,BTC-USD&region=US&lang=en-US")
+INTERVALO_NOTICIAS = float(os.getenv("INTERVALO_NOTICIAS", "2"))  # minutos
+
+@tasks.loop(minutes=INTERVALO_NOTICIAS)
+@metricas.medir("noticiero")
 async def noticiero_automatico():
     canal_id = CANALES_ALERTAS.get("NOTICIAS")
     if not canal_id: return
@@ -360,32 +504,8 @@ async def noticiero_automatico():
     if not channel: return
 
     try:
-        # 🌐 Agregador Institucional (Reuters, Bloomberg, CNBC, etc.)
-        url = "https://feeds.finance.yahoo.com/rss/2.0/headline?s=SPY,BTC-USD&region=US&lang=en-US"
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, urllib.request.urlopen, req)
-        xml_data = await loop.run_in_executor(None, response.read)
-        
-        root = ET.fromstring(xml_data)
-        items = root.findall('./channel/item')
-        
-        nuevas_noticias = []
-        global noticias_enviadas
-        
-        # 🧠 FILTRO DE DEDUPLICACIÓN
-        for item in items:
-            link = item.find('link').text
-            if link not in noticias_enviadas:
-                nuevas_noticias.append(item)
-                noticias_enviadas.add(link)
-                if len(nuevas_noticias) == 3: # Tomamos máximo las 3 más frescas
-                    break
-                    
-        # Limpieza de memoria (para no saturar la RAM del servidor en Railway)
-        if len(noticias_enviadas) > 100:
-            noticias_enviadas.clear()
+        # 🧠 FILTRO DE DEDUPLICACIÓN: solo llegan items nunca publicados (máximo las 3 más frescas)
+        nuevas_noticias = await lector_noticias.nuevas(maximo=3)
         
         # 🚀 SOLO ENVÍA MENSAJE SI HAY NOTICIAS NUEVAS
         if nuevas_noticias:
@@ -396,9 +516,9 @@ async def noticiero_automatico():
             )
             
             for item in nuevas_noticias:
-                titulo = item.find('title').text
-                link = item.find('link').text
-                desc_raw = item.find('description').text
+                titulo = item['titulo']
+                link = item['link']
+                desc_raw = item['descripcion']
                 
                 desc_limpia = re.sub(r'<[^>]+>', '', desc_raw) if desc_raw else "Haz clic en el enlace para leer los detalles."
                 if len(desc_limpia) > 200:
@@ -410,7 +530,7 @@ async def noticiero_automatico():
                     inline=False
                 )
             
-            await channel.send(embed=embed)
+            await despachador.discord(channel, embed)
             
     except Exception as e:
         print(f"❌ Error en noticiero RSS: {e}")
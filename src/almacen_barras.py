@@ -0,0 +1,107 @@
+import os
+import re
+import time
+import threading
+import pandas as pd
+
+# --- ALMACÉN LOCAL DE VELAS (OHLCV) ---
+# Guarda en disco (Parquet) las velas ya descargadas por (ticker, intervalo)
+# para que cada ronda del radar solo pida al proveedor las velas nuevas.
+DIRECTORIO_BARRAS = os.getenv("CACHE_BARRAS", os.path.join("cache", "barras"))
+MAX_BARRAS_CACHE = int(os.getenv("MAX_BARRAS_CACHE", "5000"))
+COLUMNAS_OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _normalizar_indice(df):
+    """Índice ordenado, sin duplicados y en UTC (Yahoo mezcla zonas horarias)."""
+    df = df[[c for c in COLUMNAS_OHLCV if c in df.columns]]
+    if getattr(df.index, "tz", None) is not None:
+        df.index = df.index.tz_convert("UTC")
+    df = df[~df.index.duplicated(keep='last')]
+    return df.sort_index()
+
+
+def inicio_periodo(fin, periodo):
+    """
+    Traduce un periodo de yfinance ("5d", "60d", "6mo", "1y") a la fecha de inicio.
+    Los días se cuentan hábiles, igual que Yahoo.
+    """
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", periodo)
+    if not m: return None
+    n, unidad = int(m.group(1)), m.group(2)
+    if unidad == "d": return fin - pd.offsets.BDay(n)
+    if unidad == "wk": return fin - pd.DateOffset(weeks=n)
+    if unidad == "mo": return fin - pd.DateOffset(months=n)
+    return fin - pd.DateOffset(years=n)
+
+
+class AlmacenBarras:
+    def __init__(self, directorio=None, max_barras=MAX_BARRAS_CACHE):
+        self.directorio = directorio or DIRECTORIO_BARRAS
+        self.max_barras = max_barras
+        self._memoria = {}      # (ticker, intervalo) -> DataFrame
+        self._refrescado = {}   # (ticker, intervalo) -> time.time() de la última fusión
+        self._candado = threading.RLock()  # leer/fusionar corren en hilos (asyncio.to_thread)
+
+    def _ruta(self, ticker, intervalo):
+        nombre = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.directorio, intervalo, f"{nombre}.parquet")
+
+    def leer(self, ticker, intervalo):
+        with self._candado: return self._leer(ticker, intervalo)
+
+    def _leer(self, ticker, intervalo):
+        clave = (ticker, intervalo)
+        if clave in self._memoria:
+            return self._memoria[clave]
+
+        ruta = self._ruta(ticker, intervalo)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            df = pd.read_parquet(ruta)
+        except Exception as e:
+            print(f"⚠️ Cache corrupta para {ticker} ({intervalo}): {e}")
+            return None
+        self._memoria[clave] = df
+        return df
+
+    def ultima_fecha(self, ticker, intervalo):
+        df = self.leer(ticker, intervalo)
+        if df is None or df.empty: return None
+        return df.index[-1]
+
+    def segundos_desde_refresco(self, ticker, intervalo):
+        ultimo = self._refrescado.get((ticker, intervalo))
+        return None if ultimo is None else time.time() - ultimo
+
+    def fusionar(self, ticker, intervalo, nuevas):
+        """
+        Mezcla velas nuevas con las guardadas. La última vela en caché suele estar
+        incompleta, así que ante duplicados gana la versión recién descargada.
+        """
+        with self._candado: return self._fusionar(ticker, intervalo, nuevas)
+
+    def _fusionar(self, ticker, intervalo, nuevas):
+        previas = self._leer(ticker, intervalo)
+        nuevas = _normalizar_indice(nuevas.dropna(how='all'))
+
+        if previas is not None and not previas.empty:
+            df = _normalizar_indice(pd.concat([previas, nuevas]))
+        else:
+            df = nuevas
+        df = df.iloc[-self.max_barras:]
+
+        clave = (ticker, intervalo)
+        self._memoria[clave] = df
+        self._refrescado[clave] = time.time()
+
+        ruta = self._ruta(ticker, intervalo)
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = ruta + ".tmp"
+            df.to_parquet(temporal)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar cache de {ticker}: {e}")
+        return df
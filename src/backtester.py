@@ -1 +1,264 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.isotonic import IsotonicRegression
+from src.data_loader import descargar_async, separar_por_ticker
+from src.indicadores import indicadores_panel
+from src.scanner import UNIVERSO
+from src.strategy import Predictor, PARAMETROS_ESTRATEGIA
 
+# ==========================================================
+# 📊 BACKTESTER VECTORIZADO
+# ==========================================================
+# Reproduce las reglas de entrada y los SL/TP de strategy.examinar_activo sobre
+# toda la historia sin recorrer vela por vela: las señales se calculan como
+# columnas y la salida de cada operación se busca en una ventana (operaciones × velas).
+
+HORIZONTE = {"SCALPING": 32, "SWING": 120}  # velas máximas que puede durar una operación
+CALENTAMIENTO = 200  # velas iniciales sin operar (SMA_200 todavía rellenada hacia atrás)
+
+
+def generar_senales(df, estilo="SCALPING", prob=None, parametros=None):
+    """
+    Devuelve un DataFrame con 'direccion' (1 largo, -1 corto, 0 nada), 'sl' y 'tp' por vela.
+    `prob` es la probabilidad del modelo por vela; si es None se ignora el filtro de IA
+    y solo cuentan las reglas técnicas. `parametros` sobreescribe PARAMETROS_ESTRATEGIA.
+    """
+    p = {**PARAMETROS_ESTRATEGIA, **(parametros or {})}
+    close, rsi = df['Close'], df['RSI']
+    if prob is None:
+        prob_largo = prob_corto = pd.Series(True, index=df.index)
+    else:
+        prob = pd.Series(np.asarray(prob, dtype=float), index=df.index)
+
+    if estilo == "SCALPING":
+        if prob is not None: prob_largo, prob_corto = prob > p["prob_largo_scalping"], prob < p["prob_corto_scalping"]
+        ratio = p["ratio_scalping"]
+        ema_9, ema_21 = df['EMA_9'], df['EMA_21']
+        min_reciente = df['Low'].shift(1).rolling(4).min()
+        max_reciente = df['High'].shift(1).rolling(4).max()
+
+        largo = prob_largo & (ema_9 > ema_21) & (close > ema_9) & (rsi < p["rsi_max_scalping"])
+        corto = prob_corto & (ema_9 < ema_21) & (close < ema_9) & (rsi > p["rsi_min_scalping"])
+
+        sl_largo = min_reciente.where((close - min_reciente) >= close * 0.0005, close * 0.9995)
+        sl_corto = max_reciente.where((max_reciente - close) >= close * 0.0005, close * 1.0005)
+        tp_largo = close + (close - sl_largo) * ratio
+        tp_corto = close - (sl_corto - close) * ratio
+    else:
+        if prob is not None: prob_largo, prob_corto = prob > p["prob_largo_swing"], prob < p["prob_corto_swing"]
+        sma_200, ema_50 = df['SMA_200'], df['EMA_50']
+        sl_dist, tp_dist = df['ATR'] * p["atr_sl"], df['ATR'] * p["atr_tp"]
+
+        largo = prob_largo & (close > sma_200) & (close > ema_50) & (rsi < p["rsi_max_swing"])
+        corto = prob_corto & (close < sma_200) & (close < ema_50) & (rsi > p["rsi_min_swing"])
+
+        sl_largo, tp_largo = close - sl_dist, close + tp_dist
+        sl_corto, tp_corto = close + sl_dist, close - tp_dist
+
+    # En examinar_activo el largo tiene prioridad sobre el corto
+    direccion = np.where(largo, 1, np.where(corto, -1, 0))
+    direccion[:CALENTAMIENTO] = 0
+    return pd.DataFrame({
+        'direccion': direccion,
+        'sl': np.where(direccion == 1, sl_largo, sl_corto),
+        'tp': np.where(direccion == 1, tp_largo, tp_corto),
+    }, index=df.index)
+
+
+def _sin_solapamiento(entradas, velas):
+    """Máscara de entradas tomadas con una sola posición abierta: se salta toda señal anterior a la salida previa."""
+    tomar = np.zeros(len(entradas), dtype=bool)
+    libre_desde = -1
+    for i, (barra, duracion) in enumerate(zip(entradas, velas)):
+        if barra < libre_desde: continue
+        tomar[i] = True
+        libre_desde = barra + duracion
+    return tomar
+
+
+def resolver_operaciones(df, senales, horizonte):
+    """
+    Para cada entrada busca la primera vela futura que toca el SL o el TP.
+    Si ambas se tocan en la misma vela se asume el SL (igual que ExchangeSimulado).
+    Si ninguna se toca en `horizonte` velas se cierra al precio de esa última vela.
+    Solo hay una posición abierta por ticker: las señales mientras sigue abierta no operan.
+    """
+    high, low, close = (df[c].to_numpy(dtype=float) for c in ('High', 'Low', 'Close'))
+    n = len(df)
+    entradas = np.flatnonzero(senales['direccion'].to_numpy() != 0)
+    entradas = entradas[entradas < n - 1]
+    if len(entradas) == 0 or n < 2:
+        return pd.DataFrame(columns=['fecha', 'direccion', 'entrada', 'sl', 'tp', 'salida', 'velas', 'motivo', 'retorno', 'retorno_R'])
+
+    # Ventanas de las velas siguientes, rellenadas con NaN al final de la historia
+    relleno = np.full(horizonte, np.nan)
+    ventanas_high = sliding_window_view(np.concatenate([high[1:], relleno]), horizonte)[entradas]
+    ventanas_low = sliding_window_view(np.concatenate([low[1:], relleno]), horizonte)[entradas]
+
+    direccion = senales['direccion'].to_numpy()[entradas]
+    sl = senales['sl'].to_numpy(dtype=float)[entradas]
+    tp = senales['tp'].to_numpy(dtype=float)[entradas]
+    entrada = close[entradas]
+    largo = direccion == 1
+
+    toca_sl = np.where(largo[:, None], ventanas_low <= sl[:, None], ventanas_high >= sl[:, None])
+    toca_tp = np.where(largo[:, None], ventanas_high >= tp[:, None], ventanas_low <= tp[:, None])
+    primer_sl = np.where(toca_sl.any(axis=1), toca_sl.argmax(axis=1), horizonte)
+    primer_tp = np.where(toca_tp.any(axis=1), toca_tp.argmax(axis=1), horizonte)
+
+    ultima = np.minimum(entradas + horizonte, n - 1)
+    por_sl = (primer_sl <= primer_tp) & (primer_sl < horizonte)
+    por_tp = (primer_tp < primer_sl)
+    salida = np.where(por_sl, sl, np.where(por_tp, tp, close[ultima]))
+    velas = np.where(por_sl, primer_sl + 1, np.where(por_tp, primer_tp + 1, ultima - entradas))
+    motivo = np.where(por_sl, 'SL', np.where(por_tp, 'TP', 'TIEMPO'))
+
+    tomar = _sin_solapamiento(entradas, velas)
+    entradas, direccion, entrada, sl, tp = entradas[tomar], direccion[tomar], entrada[tomar], sl[tomar], tp[tomar]
+    salida, velas, motivo = salida[tomar], velas[tomar], motivo[tomar]
+
+    retorno = (salida - entrada) / entrada * direccion
+    riesgo = np.abs(entrada - sl) / entrada
+    retorno_r = np.divide(retorno, riesgo, out=np.zeros_like(retorno), where=riesgo > 0)
+
+    return pd.DataFrame({
+        'fecha': df.index[entradas],
+        'direccion': direccion,
+        'entrada': entrada,
+        'sl': sl,
+        'tp': tp,
+        'salida': salida,
+        'velas': velas,
+        'motivo': motivo,
+        'retorno': retorno,
+        'retorno_R': retorno_r,
+    })
+
+
+def metricas(operaciones):
+    """
+    Tasa de acierto, expectativa (en % y en R) y máximo drawdown de la curva acumulada.
+    `operaciones` no debe solaparse en el tiempo (resolver_operaciones ya lo garantiza).
+    """
+    if operaciones.empty:
+        return {"operaciones": 0, "aciertos": np.nan, "expectativa": np.nan,
+                "expectativa_R": np.nan, "max_drawdown": 0.0, "retorno_total": 0.0}
+    retornos = operaciones['retorno'].to_numpy()
+    curva = np.cumsum(retornos)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], curva]))[1:] - curva
+    return {
+        "operaciones": len(retornos),
+        "aciertos": float((retornos > 0).mean()),
+        "expectativa": float(retornos.mean()),
+        "expectativa_R": float(operaciones['retorno_R'].mean()),
+        "max_drawdown": float(drawdown.max()),
+        "retorno_total": float(curva[-1]),
+    }
+
+
+def metricas_cartera(por_ticker):
+    """
+    Agrega {ticker: operaciones} sin mezclar curvas: cada ticker tiene su propia curva
+    y la cartera reparte el capital en partes iguales. Aciertos y expectativas se
+    promedian por operación; el drawdown es el peor de los tickers.
+    """
+    con_operaciones = [ops for ops in por_ticker.values() if not ops.empty]
+    if not con_operaciones: return metricas(pd.DataFrame(columns=['retorno', 'retorno_R']))
+    todas = pd.concat(con_operaciones, ignore_index=True)
+    individuales = [metricas(ops) for ops in por_ticker.values()]
+    return {
+        **{k: v for k, v in metricas(todas).items() if k in ("operaciones", "aciertos", "expectativa", "expectativa_R")},
+        "max_drawdown": max(m["max_drawdown"] for m in individuales),
+        "retorno_total": float(np.mean([m["retorno_total"] for m in individuales])),
+    }
+
+
+def backtest_ticker(df, estilo="SCALPING", prob=None, horizonte=None, parametros=None):
+    """df debe traer los indicadores (data_loader.calcular_indicadores). Devuelve (operaciones, métricas)."""
+    horizonte = horizonte or HORIZONTE.get(estilo, HORIZONTE["SWING"])
+    operaciones = resolver_operaciones(df, generar_senales(df, estilo, prob, parametros), horizonte)
+    return operaciones, metricas(operaciones)
+
+
+def backtest_universo(barras, estilo="SCALPING", probabilidades=None, horizonte=None):
+    """
+    Corre el backtest de {ticker: OHLCV} y devuelve un DataFrame de métricas por ticker.
+    Los indicadores se calculan para todos en una pasada (indicadores_panel).
+    `probabilidades` es opcional: {ticker: probabilidad por vela}.
+    """
+    probabilidades = probabilidades or {}
+    filas = {}
+    for ticker, df in indicadores_panel(barras).items():
+        _, resultado = backtest_ticker(df, estilo, probabilidades.get(ticker), horizonte)
+        filas[ticker] = resultado
+    return pd.DataFrame.from_dict(filas, orient='index')
+
+
+# ==========================================================
+# 🔁 WALK-FORWARD DEL MODELO
+# ==========================================================
+# En vez de reentrenar en cada vela (O(n²)), se entrena cada `cada` velas con las
+# `ventana` anteriores y se predicen las `cada` siguientes en un solo predict_proba.
+# La calibración (isotónica) se ajusta solo con predicciones fuera de muestra ya
+# resueltas, así que tampoco mira el futuro.
+
+MIN_CALIBRACION = 200  # predicciones resueltas necesarias antes de calibrar
+
+
+def probabilidades_walk_forward(df, cada=96, ventana=500, minimo=210, calibrar=True, n_jobs=-1):
+    """
+    df con indicadores (data_loader.calcular_indicadores). Devuelve un DataFrame con
+    'prob' (cruda) y 'prob_calibrada' por vela; NaN durante las primeras `minimo` velas.
+    Igual que examinar_activo, la vela t se predice con un modelo entrenado hasta t-1.
+    """
+    objetivo = df['Target'].to_numpy()
+    n = len(df)
+    crudas = np.full(n, np.nan)
+    calibradas = np.full(n, np.nan)
+
+    for inicio in range(minimo, n, cada):
+        fin = min(inicio + cada, n)
+        predictor = Predictor()
+        predictor.model.set_params(n_jobs=n_jobs)
+        predictor.entrenar(df.iloc[max(0, inicio - ventana):inicio])
+        _, crudas[inicio:fin] = predictor.predecir_lote(df.iloc[inicio:fin])
+
+        calibradas[inicio:fin] = crudas[inicio:fin]
+        if calibrar and inicio - minimo >= MIN_CALIBRACION:
+            isotonica = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+            isotonica.fit(crudas[minimo:inicio], objetivo[minimo:inicio])
+            calibradas[inicio:fin] = isotonica.predict(crudas[inicio:fin])
+
+    return pd.DataFrame({'prob': crudas, 'prob_calibrada': calibradas}, index=df.index)
+
+
+def walk_forward_universo(barras, estilo="SWING", cada=96, ventana=500, calibrada=True):
+    """
+    Walk-forward + backtest de {ticker: OHLCV}. Devuelve (métricas por ticker, {ticker: probabilidades}).
+    Las métricas suman el Brier score de la probabilidad usada como filtro.
+    """
+    columna = 'prob_calibrada' if calibrada else 'prob'
+    filas, series = {}, {}
+    for ticker, df in indicadores_panel(barras).items():
+        probs = probabilidades_walk_forward(df, cada=cada, ventana=ventana, calibrar=calibrada)
+        series[ticker] = probs
+        _, resultado = backtest_ticker(df, estilo, probs[columna].fillna(0.5))
+
+        validas = probs[columna].notna().to_numpy().copy()
+        validas[-1] = False  # la última vela no tiene Target real
+        errores = probs[columna].to_numpy()[validas] - df['Target'].to_numpy()[validas]
+        resultado["brier"] = float(np.mean(errores ** 2)) if errores.size else np.nan
+        filas[ticker] = resultado
+    return pd.DataFrame.from_dict(filas, orient='index'), series
+
+
+async def descargar_historia(tickers, periodo="2y", intervalo="1h"):
+    """Historia larga para backtests. No pasa por el almacén local, que se recorta a MAX_BARRAS_CACHE."""
+    datos = await descargar_async(tickers, period=periodo, interval=intervalo, auto_adjust=True, group_by="ticker", timeout=300)
+    return separar_por_ticker(datos, tickers)
+
+
+async def backtest_mercado(categoria="GENERAL", estilo="SWING", periodo="2y", intervalo="1h"):
+    barras = await descargar_historia(UNIVERSO.get(categoria, UNIVERSO["GENERAL"]), periodo, intervalo)
+    return backtest_universo(barras, estilo)
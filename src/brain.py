@@ -1,9 +1,16 @@
 import os
 import json
 import re
+import asyncio
+import unicodedata
 from openai import OpenAI
 # Importamos la normalización desde data_loader
-from src.data_loader import normalizar_ticker 
+from src.data_loader import normalizar_ticker, ALIAS_CRIPTO
+from src.scanner import UNIVERSO
+from src.universo import universo
+from src.instrumentos import metadatos
+from src.cache_ttl import CacheTTL
+from src.metricas import metricas
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 client = None
@@ -11,7 +18,108 @@ if GROQ_API_KEY:
     try: client = OpenAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
     except: pass
 
+# ==========================================================
+# ⚡ RUTA RÁPIDA: PARSER LOCAL + CACHE DE INTENCIONES
+# ==========================================================
+# Los comandos comunes ("analiza BTC swing", "recomienda cripto") se resuelven
+# sin llamar al LLM. Lo demás va a Groq y la respuesta se guarda por mensaje normalizado.
+cache_intenciones = CacheTTL(capacidad=int(os.getenv("CACHE_INTENCIONES", "512")), ttl=float(os.getenv("TTL_INTENCIONES", "3600")))
+
+VERBOS_ANALIZAR = ("analiza", "analizar", "analisis", "revisa", "revisar", "mira", "chequea", "calcula")
+VERBOS_RECOMENDAR = ("recomienda", "recomiendame", "recomendar", "busca", "buscame", "buscar", "escanea", "escanear", "dame", "pasame")
+OBJETOS_RECOMENDAR = ("recomendacion", "recomendaciones", "oportunidad", "oportunidades", "senal", "senales", "algo", "mercado")
+NEGACIONES = {"no", "ni", "nunca", "jamas", "deja", "dejes", "pares", "basta"}
+PALABRAS_PREGUNTA = {"que", "como", "cual", "cuales", "cuando", "donde", "porque", "quien", "explica", "explicame"}
+PALABRAS_CATEGORIA = {
+    "FOREX": ("forex", "divisas", "divisa", "monedas", "fx"),
+    "CRIPTO": ("cripto", "criptos", "crypto", "criptomonedas"),
+    "ACCIONES": ("acciones", "accion", "empresas", "stocks", "bolsa"),
+}
+PALABRAS_RELLENO = {"el", "la", "los", "las", "un", "una", "a", "al", "en", "de", "del", "para", "por", "favor",
+                    "me", "mi", "que", "como", "esta", "va", "y", "modo", "estilo", "ahora", "hoy", "porfa", "pls"}
+TICKERS_CONOCIDOS = {t for lista in UNIVERSO.values() for t in lista}
+
+
+def normalizar_mensaje(msg):
+    """Minúsculas, sin tildes, sin signos y con espacios simples: clave de la cache."""
+    texto = unicodedata.normalize("NFKD", msg.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[¿?¡!,;:]", " ", texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+def _es_ticker(token, original):
+    alto = token.upper()
+    if alto in ALIAS_CRIPTO or alto in TICKERS_CONOCIDOS: return True
+    if re.fullmatch(r"[A-Z0-9^]{1,10}(-USD|=X|=F|\.[A-Z]{1,3})", alto): return True
+    # Siglas escritas en mayúsculas por el usuario (AAPL, NVDA)
+    return re.search(rf"(?<![A-Za-z]){re.escape(alto)}(?![A-Za-z])", original) is not None and re.fullmatch(r"[A-Z]{2,5}", alto) is not None
+
+
+def interpretar_local(msg):
+    """
+    Parser determinista para las formas de comando más comunes.
+    Devuelve el mismo dict que el LLM, o None si el mensaje es ambiguo.
+    """
+    texto = normalizar_mensaje(msg)
+    tokens = texto.split()
+    if not tokens or "?" in msg or NEGACIONES & set(tokens): return None
+
+    # Solo mensajes con forma de orden: el verbo va primero
+    if tokens[0] in VERBOS_ANALIZAR: accion = "ANALIZAR"
+    elif tokens[0] in VERBOS_RECOMENDAR and not PALABRAS_PREGUNTA & set(tokens): accion = "RECOMENDAR"
+    else: return None
+
+    estilo = "SWING" if "swing" in tokens else "SCALPING"
+    categoria = "GENERAL"
+    for cat, palabras in PALABRAS_CATEGORIA.items():
+        if any(t in palabras for t in tokens): categoria = cat
+
+    ignorar = PALABRAS_RELLENO | {"swing", "scalping", "scalp"} | set(VERBOS_ANALIZAR) | set(VERBOS_RECOMENDAR) | set(OBJETOS_RECOMENDAR)
+    ignorar |= {p for palabras in PALABRAS_CATEGORIA.values() for p in palabras}
+    resto = [t for t in tokens if t not in ignorar]
+
+    if accion == "RECOMENDAR":
+        # Cualquier palabra de más ("busca oportunidades en BTC", "dame tu opinión") la decide el LLM
+        if resto: return None
+        return {"accion": "RECOMENDAR", "ticker": None, "lista_activos": None, "estilo": estilo,
+                "categoria": categoria, "explicacion": None}
+
+    if len(resto) != 1 or not _es_ticker(resto[0], msg): return None
+    ticker = normalizar_ticker(resto[0])
+    for cat in universo.categorias_de(ticker):
+        if cat in PALABRAS_CATEGORIA: categoria = cat
+    return {"accion": "ANALIZAR", "ticker": ticker, "lista_activos": None, "estilo": estilo,
+            "categoria": categoria, "explicacion": None}
+
+
+def _intencion_rapida(msg):
+    """Parser local o cache de intenciones; None si hay que preguntarle al LLM."""
+    local = interpretar_local(msg)
+    if local:
+        metricas.contar("intenciones", ruta="local")
+        return local
+    guardado = cache_intenciones.obtener(normalizar_mensaje(msg))
+    if guardado:
+        metricas.contar("intenciones", ruta="cache")
+        return dict(guardado)
+    return None
+
+
+async def interpretar_intencion_async(msg):
+    """Versión para el event loop: ruta rápida local/cache y, si hace falta, el LLM en un hilo aparte."""
+    return _intencion_rapida(msg) or await asyncio.to_thread(_intencion_llm, msg)
+
+
 def interpretar_intencion(msg):
+    return _intencion_rapida(msg) or _intencion_llm(msg)
+
+
+@metricas.medir("interpretar_intencion")
+def _intencion_llm(msg):
+    metricas.contar("intenciones", ruta="llm")
+    clave = normalizar_mensaje(msg)
+
     if not client: return {"accion": "CHARLA"}
     # Convertimos a minúsculas para que sea más fácil buscar (usa tu variable msg)
     mensaje_limpio = msg.lower()
@@ -46,13 +154,15 @@ def interpretar_intencion(msg):
     }}
     """
     try:
-        resp = client.chat.completions.create(model="llama-3.3-70b-versatile", messages=[{"role":"user", "content":prompt}, {"role":"system", "content":"JSON only"}])
+        with metricas.cronometrar("groq_intencion"):
+            resp = client.chat.completions.create(model="llama-3.3-70b-versatile", messages=[{"role":"user", "content":prompt}, {"role":"system", "content":"JSON only"}])
         data = json.loads(re.search(r"\{.*\}", resp.choices[0].message.content, re.DOTALL).group(0))
         
         # Normalizamos los tickers aquí mismo
         if data.get("ticker"): data["ticker"] = normalizar_ticker(data["ticker"])
         if data.get("lista_activos"): data["lista_activos"] = [normalizar_ticker(t) for t in data["lista_activos"]]
         
+        cache_intenciones.guardar(clave, dict(data))
         return data
     except: return {"accion":"CHARLA", "categoria": "GENERAL"}
 
@@ -68,3 +178,79 @@ def generar_resumen_humano(datos_txt, prob):
         return resp.choices[0].message.content.replace('"', '')
     except: return "Mercado volátil."
 
+
+# ==========================================================
+# 📝 RESÚMENES POR LOTE PARA LAS SEÑALES DEL RADAR
+# ==========================================================
+# Todas las señales pendientes van en UNA sola petición con respuesta JSON por ítem.
+# Cache por (ticker, veredicto, RSI redondeado, probabilidad redondeada) y, si el
+# LLM tarda más de TIMEOUT_RESUMENES, se usa una plantilla local.
+cache_resumenes = CacheTTL(capacidad=1024, ttl=float(os.getenv("TTL_RESUMENES", "7200")))
+TIMEOUT_RESUMENES = float(os.getenv("TIMEOUT_RESUMENES", "8"))
+metricas.registrar_cache("intenciones", cache_intenciones)
+metricas.registrar_cache("resumenes", cache_resumenes)
+
+
+def clave_resumen(info, prob):
+    try: rsi = round(float(info.get('rsi', 0)))
+    except (TypeError, ValueError): rsi = None
+    return (info.get('ticker'), info.get('veredicto'), rsi, round(float(prob), 2))
+
+
+def resumen_plantilla(info, prob):
+    rsi = info.get('rsi')
+    rsi = f"{rsi:.1f}" if isinstance(rsi, (int, float)) else '-'
+    return f"{info.get('motivo', 'Sin señal clara')}. RSI {rsi}, probabilidad {float(prob)*100:.0f}%."
+
+
+@metricas.medir("groq_resumenes")
+def _pedir_resumenes(pendientes):
+    """
+    Corre en un hilo. pendientes: {clave: (info, prob)} -> {clave: texto}.
+    Lo que llegue se guarda en la cache aunque el llamador ya haya dejado de esperar.
+    """
+    claves = list(pendientes)
+    lineas = []
+    for i, clave in enumerate(claves):
+        info, prob = pendientes[clave]
+        precio = metadatos.formatear_precio(info.get('simbolo'), info.get('precio'))
+        lineas.append(f"{i}. {info.get('ticker')} | {info.get('veredicto')} | precio {precio} | "
+                      f"RSI {float(info.get('rsi', 0)):.1f} | prob {float(prob):.2f} | {info.get('motivo', '')}")
+    prompt = (
+        "Para cada señal de trading explica en máximo 15 palabras, en español, por qué conviene tomarla. "
+        'Responde SOLO JSON: {"resumenes": [{"id": 0, "texto": "..."}]}\n' + "\n".join(lineas)
+    )
+    resp = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[{"role": "user", "content": prompt}, {"role": "system", "content": "JSON only"}],
+        max_tokens=40 * len(claves) + 50,
+    )
+    data = json.loads(re.search(r"\{.*\}", resp.choices[0].message.content, re.DOTALL).group(0))
+
+    textos = {}
+    for item in data.get("resumenes", []):
+        try: clave = claves[int(item["id"])]
+        except (KeyError, ValueError, IndexError, TypeError): continue
+        textos[clave] = str(item.get("texto", "")).replace('"', '').strip()
+        cache_resumenes.guardar(clave, textos[clave])
+    return textos
+
+
+@metricas.medir("resumir_senales")
+async def resumir_senales(senales, timeout=None):
+    """
+    senales: [(info, prob)] -> lista de resúmenes en el mismo orden.
+    Nunca lanza: ante error o timeout devuelve la plantilla para lo que falte.
+    """
+    claves = [clave_resumen(info, prob) for info, prob in senales]
+    resultado = {c: cache_resumenes.obtener(c) for c in claves}
+    pendientes = {c: s for c, s in zip(claves, senales) if resultado[c] is None}
+
+    if pendientes and client:
+        try:
+            nuevos = await asyncio.wait_for(asyncio.to_thread(_pedir_resumenes, pendientes), timeout=timeout or TIMEOUT_RESUMENES)
+            resultado.update(nuevos)
+        except Exception as e:
+            print(f"⚠️ Resúmenes IA no disponibles ({type(e).__name__}), usando plantilla.")
+
+    return [resultado.get(c) or resumen_plantilla(info, prob) for c, (info, prob) in zip(claves, senales)]
@@ -0,0 +1,59 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """
+    Cache LRU con vencimiento: guarda hasta `capacidad` claves y cada una vive `ttl` segundos.
+    Al llenarse expulsa la menos usada. Se puede usar desde hilos (asyncio.to_thread).
+    """
+    def __init__(self, capacidad=512, ttl=3600):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (vence_en, valor)
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, defecto=None):
+        with self._candado:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] < time.time():
+                if entrada is not None: del self._datos[clave]
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor, ttl=None):
+        with self._candado:
+            self._datos[clave] = (time.time() + (self.ttl if ttl is None else ttl), valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def exportar(self):
+        """Entradas vigentes como [clave, vence_en, valor], de la menos a la más usada (para persistir)."""
+        ahora = time.time()
+        with self._candado:
+            return [[clave, vence, valor] for clave, (vence, valor) in self._datos.items() if vence >= ahora]
+
+    def importar(self, entradas):
+        """Carga lo que devolvió exportar(), descartando lo vencido."""
+        ahora = time.time()
+        with self._candado:
+            for clave, vence, valor in entradas:
+                if vence < ahora: continue
+                self._datos[clave] = (vence, valor)
+                self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def __contains__(self, clave):
+        entrada = self._datos.get(clave)
+        return entrada is not None and entrada[0] >= time.time()
+
+    def __len__(self):
+        return len(self._datos)
@@ -1,111 +1,223 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import yfinance as yf
 import pandas as pd
-import numpy as np
+from src.almacen_barras import AlmacenBarras, inicio_periodo
+from src.indicadores import calcular_columnas, indicadores_panel, IndicadoresEnVivo, compactar
+from src.metricas import metricas
+from src.universo import universo
+
+# --- CAPA DE DESCARGA ASÍNCRONA ---
+# yf.download es bloqueante: lo corremos en un pool acotado de hilos para no
+# congelar el event loop de Discord mientras se escanea el mercado.
+MAX_DESCARGAS = int(os.getenv("YF_MAX_DESCARGAS", "4"))
+TIMEOUT_DESCARGA = float(os.getenv("YF_TIMEOUT", "30"))
+
+_pool_descargas = ThreadPoolExecutor(max_workers=MAX_DESCARGAS, thread_name_prefix="yf")
+
+async def descargar_async(tickers, timeout=None, **kwargs):
+    """
+    Versión awaitable de yf.download. Corre en el pool de descargas y
+    lanza asyncio.TimeoutError si el proveedor tarda más de `timeout` segundos.
+    """
+    loop = asyncio.get_running_loop()
+    kwargs.setdefault("progress", False)
+    tarea = loop.run_in_executor(_pool_descargas, partial(yf.download, tickers, **kwargs))
+    metricas.contar("tickers_pedidos", 1 if isinstance(tickers, str) else len(tickers))
+    with metricas.cronometrar("yf_download"):
+        return await asyncio.wait_for(tarea, timeout=timeout or TIMEOUT_DESCARGA)
+
+# --- CACHE LOCAL DE VELAS ---
+# Si un ticker se refrescó hace menos de FRESCURA_CACHE segundos no se vuelve a pedir.
+FRESCURA_CACHE = float(os.getenv("FRESCURA_CACHE", "60"))
+almacen = AlmacenBarras()
+# MODO_COMPACTO=1: velas e indicadores en float32 contiguo (menos RAM en instancias chicas)
+MODO_COMPACTO = os.getenv("MODO_COMPACTO") == "1"
+en_vivo = IndicadoresEnVivo()
+
+def separar_por_ticker(datos, tickers):
+    """Parte una descarga multi-ticker de Yahoo en {ticker: DataFrame OHLCV}."""
+    if datos is None or datos.empty: return {}
+    if not isinstance(datos.columns, pd.MultiIndex):
+        return {tickers[0]: datos} if len(tickers) == 1 else {}
+
+    nivel = 0 if set(tickers) & set(datos.columns.get_level_values(0)) else 1
+    presentes = set(datos.columns.get_level_values(nivel))
+    separados = {}
+    for t in tickers:
+        if t not in presentes: continue
+        df = datos.xs(t, axis=1, level=nivel).dropna(how='all')
+        if not df.empty: separados[t] = df
+    return separados
+
+# Lectura, fusión y escritura de Parquet son bloqueantes: las funciones _almacen_*
+# corren en un hilo (asyncio.to_thread) para no frenar el event loop ni el heartbeat.
+def _almacen_pendientes(tickers, intervalo):
+    """Separa los tickers a refrescar en (nuevos, conocidos, última fecha común de los conocidos)."""
+    nuevos, conocidos, fechas = [], [], []
+    for t in tickers:
+        edad = almacen.segundos_desde_refresco(t, intervalo)
+        if edad is not None and edad < FRESCURA_CACHE: continue
+        ultima = almacen.ultima_fecha(t, intervalo)
+        if ultima is None: nuevos.append(t)
+        else:
+            conocidos.append(t)
+            fechas.append(ultima)
+    return nuevos, conocidos, min(fechas) if fechas else None
+
+def _almacen_fusionar(datos, tickers, intervalo):
+    for t, df in separar_por_ticker(datos, tickers).items():
+        almacen.fusionar(t, intervalo, df)
+
+def _almacen_leer(tickers, periodo, intervalo):
+    barras = {}
+    for t in tickers:
+        df = almacen.leer(t, intervalo)
+        if df is None or df.empty: continue
+        inicio = inicio_periodo(df.index[-1], periodo)
+        barras[t] = df[df.index > inicio] if inicio is not None else df
+    return barras
+
+async def obtener_barras(tickers, periodo, intervalo):
+    """
+    Devuelve {ticker: DataFrame OHLCV} para el periodo pedido.
+    Los tickers sin caché se descargan completos; el resto solo pide
+    las velas posteriores a la última guardada y las fusiona.
+    """
+    nuevos, conocidos, desde = await asyncio.to_thread(_almacen_pendientes, tickers, intervalo)
+    metricas.contar("barras", len(tickers) - len(nuevos) - len(conocidos), origen="cache")
+    metricas.contar("barras", len(conocidos), origen="incremental")
+    metricas.contar("barras", len(nuevos), origen="completa")
+
+    if nuevos:
+        datos = await descargar_async(nuevos, period=periodo, interval=intervalo, auto_adjust=True, group_by="ticker")
+        await asyncio.to_thread(_almacen_fusionar, datos, nuevos, intervalo)
+
+    if conocidos:
+        # Tras una parada larga no pedimos más historia de la que cubre el periodo
+        limite = inicio_periodo(pd.Timestamp.now(tz=desde.tz), periodo)
+        if limite is not None and desde < limite: desde = limite
+        datos = await descargar_async(conocidos, start=desde, interval=intervalo, auto_adjust=True, group_by="ticker")
+        await asyncio.to_thread(_almacen_fusionar, datos, conocidos, intervalo)
+
+    return await asyncio.to_thread(_almacen_leer, tickers, periodo, intervalo)
 
 # --- DICCIONARIO DE TRADUCCIÓN ---
-ALIAS_CRIPTO = {
-    "BTC": "BTC-USD",
-    "BITCOIN": "BTC-USD",
-    "ETH": "ETH-USD",
-    "ETHEREUM": "ETH-USD",
-    "SOL": "SOL-USD",
-    "SOLANA": "SOL-USD",
-    "XRP": "XRP-USD",
-    "RIPPLE": "XRP-USD",
-    "ADA": "ADA-USD",
-    "CARDANO": "ADA-USD",
-    "DOT": "DOT-USD",
-    "POLKADOT": "DOT-USD",
-    "MATIC": "MATIC-USD",
-    "DOGE": "DOGE-USD",
-    "SHIB": "SHIB-USD",
-    "LTC": "LTC-USD",
-    "LINK": "LINK-USD",
-    "BNB": "BNB-USD",
-    # Forex Comunes
-    "EUR": "EURUSD=X",
-    "GBP": "GBPUSD=X",
-    "YEN": "USDJPY=X",
-    "ORO": "GC=F",
-    "XAU": "GC=F",
-    "S&P500": "^GSPC",
-    "NASDAQ": "^IXIC"
-}
+# Los alias salen del maestro de instrumentos (data/universo.csv): índice ALIAS -> ticker
+ALIAS_CRIPTO = universo.alias
 
 def normalizar_ticker(ticker):
-    if not ticker: return None
-    ticker = ticker.upper().strip()
-    return ALIAS_CRIPTO.get(ticker, ticker)
+    return universo.normalizar(ticker)
+
+PARAMETROS_ESTILO = {
+    "SCALPING": ("5d", "15m"),
+    "SWING": ("60d", "1h"),
+}
 
+def armar_panel(barras, periodo, intervalo):
+    """
+    Junta {ticker: OHLCV} en un único DataFrame ancho con columnas (ticker, campo).
+    El intervalo queda en panel.attrs para saber si el análisis puede reutilizarlo.
+    """
+    if not barras: return None
+    panel = pd.concat(barras, axis=1)
+    panel.attrs["periodo"] = periodo
+    panel.attrs["intervalo"] = intervalo
+    return panel
+
+def extraer_del_panel(panel, ticker):
+    if panel is None or ticker not in panel.columns.get_level_values(0): return None
+    return panel[ticker].dropna(how='all')
+
+def calcular_indicadores(df, compacto=None):
+    """
+    Limpia las velas OHLCV de un ticker y agrega los indicadores de la estrategia.
+    Para varios tickers a la vez usar indicadores.indicadores_panel.
+    compacto=None sigue a MODO_COMPACTO.
+    """
+    # Limpieza MultiIndex Yahoo
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    
+    df = df.dropna()
+
+    # ==========================================================
+    # 🧮 CÁLCULO NATIVO DE INDICADORES (A PRUEBA DE FALLOS)
+    # ==========================================================
+    # RSI, MACD, Bollinger, ATR, EMAs/SMA_200 y Target (ver src/indicadores.py)
+    for nombre, valores in calcular_columnas(df['High'], df['Low'], df['Close']).items():
+        df[nombre] = valores
+
+    # Llenar datos faltantes sin eliminar la vela actual (en vivo)
+    if MODO_COMPACTO if compacto is None else compacto:
+        return compactar(df)
+    return df.bfill().ffill()
+
+@metricas.medir("descargar_datos")
 async def descargar_datos(ticker, estilo="SCALPING"):
     ticker = normalizar_ticker(ticker)
     print(f"📥 Descargando: {ticker}")
 
     try:
-        if estilo == "SCALPING":
-            periodo = "5d"
-            intervalo = "15m"
-        else: # SWING
-            periodo = "60d"
-            intervalo = "1h"
+        periodo, intervalo = PARAMETROS_ESTILO.get(estilo, PARAMETROS_ESTILO["SWING"])
 
-        df = yf.download(ticker, period=periodo, interval=intervalo, progress=False)
+        df = (await obtener_barras([ticker], periodo, intervalo)).get(ticker)
 
         if df is None or df.empty or len(df) < 20:
             if "-" not in ticker and "=" not in ticker:
                 ticker_rescue = ticker + "-USD"
                 print(f"⚠️ Reintentando con: {ticker_rescue}")
-                df = yf.download(ticker_rescue, period=periodo, interval=intervalo, progress=False)
+                df = (await obtener_barras([ticker_rescue], periodo, intervalo)).get(ticker_rescue)
                 if df is None or df.empty: return None, False
             else:
                 return None, False
 
-        # Limpieza MultiIndex Yahoo
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-        
-        df = df.dropna()
-
-        # ==========================================================
-        # 🧮 CÁLCULO NATIVO DE INDICADORES (A PRUEBA DE FALLOS)
-        # ==========================================================
-        
-        # 1. RSI
-        delta = df['Close'].diff()
-        gain = delta.where(delta > 0, 0).ewm(alpha=1/14, adjust=False).mean()
-        loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-
-        # 2. MACD
-        ema12 = df['Close'].ewm(span=12, adjust=False).mean()
-        ema26 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema12 - ema26
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-
-        # 3. Bandas de Bollinger & Volatilidad
-        sma20 = df['Close'].rolling(window=20).mean()
-        std20 = df['Close'].rolling(window=20).std()
-        df['Upper'] = sma20 + (std20 * 2)
-        df['Lower'] = sma20 - (std20 * 2)
-        df['Volatilidad'] = (df['Upper'] - df['Lower']) / df['Close']
-
-        # 4. ATR (Average True Range para el Stop Loss)
-        high_low = df['High'] - df['Low']
-        high_close = np.abs(df['High'] - df['Close'].shift())
-        low_close = np.abs(df['Low'] - df['Close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = np.max(ranges, axis=1)
-        df['ATR'] = true_range.rolling(14).mean()
-
-        # 5. Target IA (Shift -1)
-        df['Target'] = (df['Close'].shift(-1) > df['Close']).astype(int)
-
-        # Llenar datos faltantes sin eliminar la vela actual (en vivo)
-        df = df.bfill().ffill()
-
-        return df, False
+        return calcular_indicadores(df), False
 
     except Exception as e:
         print(f"❌ Error en data_loader: {e}")
         return None, False
+
+async def indicadores_en_vivo(ticker, estilo="SCALPING"):
+    """
+    Indicadores de la última vela de un ticker, actualizados de forma incremental.
+    Pensado para re-evaluar seguido: solo se procesan las velas nuevas desde la última llamada.
+    Todavía no la usa ninguna rutina del bot: el radar y los análisis manuales necesitan la
+    historia completa con indicadores para el modelo (descargar_datos / descargar_lote).
+    """
+    ticker = normalizar_ticker(ticker)
+    periodo, intervalo = PARAMETROS_ESTILO.get(estilo, PARAMETROS_ESTILO["SWING"])
+    try:
+        df = (await obtener_barras([ticker], periodo, intervalo)).get(ticker)
+        if df is None or df.empty: return {}
+        return en_vivo.sincronizar(ticker, intervalo, df)
+    except Exception as e:
+        print(f"❌ Error en indicadores en vivo de {ticker}: {e}")
+        return {}
+
+async def descargar_lote(tickers, estilo="SCALPING", panel=None, compacto=None):
+    """
+    Prepara de una vez los datos de varios candidatos: {ticker: DataFrame con indicadores}.
+    Si el panel del scanner ya viene en el intervalo del estilo se usa tal cual;
+    si no, se hace una sola descarga multi-ticker para todos.
+    Los tickers que falten se pueden pedir luego uno a uno con descargar_datos.
+    """
+    periodo, intervalo = PARAMETROS_ESTILO.get(estilo, PARAMETROS_ESTILO["SWING"])
+
+    try:
+        if panel is not None and panel.attrs.get("intervalo") == intervalo:
+            barras = {t: extraer_del_panel(panel, t) for t in tickers}
+        else:
+            barras = await obtener_barras(tickers, periodo, intervalo)
+    except Exception as e:
+        print(f"❌ Error en descarga por lote: {e}")
+        return {}
+
+    barras = {t: df for t, df in barras.items() if df is not None and len(df) >= 20}
+    try:
+        return indicadores_panel(barras, MODO_COMPACTO if compacto is None else compacto)
+    except Exception as e:
+        print(f"⚠️ Indicadores por lote fallidos: {e}")
+        return {}
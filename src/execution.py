@@ -1 +1,246 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+from collections import deque
+import ccxt
+import ccxt.async_support as ccxt_async
+from src.metricas import metricas
 
+# ==========================================================
+# 🔌 EJECUCIÓN DE ÓRDENES (BROKER ASÍNCRONO)
+# ==========================================================
+# Una sola sesión HTTP compartida, mercados precargados y reintentos solo ante
+# fallos de red. Cada orden lleva un clientOrderId fijo, así un reintento nunca
+# duplica una orden que el exchange sí alcanzó a recibir: si el reintento se rechaza
+# por clientOrderId repetido, se busca la orden original y se devuelve esa.
+REINTENTOS_ORDEN = int(os.getenv("REINTENTOS_ORDEN", "2"))
+ESPERA_REINTENTO = float(os.getenv("ESPERA_REINTENTO", "0.5"))
+
+
+class BrokerAsync:
+    def __init__(self, exchange, reintentos=REINTENTOS_ORDEN, espera=ESPERA_REINTENTO):
+        self.exchange = exchange
+        self.reintentos = reintentos
+        self.espera = espera
+        self.latencias = deque(maxlen=500)  # (símbolo, segundos desde envío hasta confirmación)
+        self._mercados = None
+
+    @classmethod
+    def okx(cls, api_key, secret, password, sandbox=True, **kwargs):
+        exchange = ccxt_async.okx({
+            'apiKey': api_key,
+            'secret': secret,
+            'password': password,
+            'enableRateLimit': True,
+        })
+        exchange.set_sandbox_mode(sandbox)
+        return cls(exchange, **kwargs)
+
+    async def conectar(self):
+        """Carga los mercados una sola vez; las órdenes siguientes ya no los piden."""
+        if self._mercados is None:
+            self._mercados = await self.exchange.load_markets()
+        return self._mercados
+
+    async def crear_orden_mercado(self, symbol, side, amount, params=None):
+        await self.conectar()
+        params = dict(params or {})
+        params.setdefault('clientOrderId', uuid.uuid4().hex)
+
+        cid = params['clientOrderId']
+        falla_red = False
+        for intento in range(self.reintentos + 1):
+            inicio = time.perf_counter()
+            try:
+                orden = await self.exchange.create_market_order(symbol, side, amount, params=params)
+            except ccxt.InvalidOrder as e:
+                # Tras una falla de red el primer envío pudo haber llegado: solo un rechazo
+                # por clientOrderId repetido lleva a buscar la orden original
+                duplicada = isinstance(e, ccxt.DuplicateOrderId) or cid in str(e)
+                if not (falla_red and duplicada): raise
+                orden = await self._buscar_por_cliente(symbol, cid)
+                if orden is None: raise
+                # La latencia de esta vuelta no es la de la orden original: no se registra
+                print(f"♻️ La orden {cid} ya estaba en el exchange: se usa esa")
+                return orden
+            except ccxt.NetworkError as e:
+                falla_red = True
+                metricas.contar("reintentos_orden")
+                if intento == self.reintentos: raise
+                print(f"⚠️ Falla de red enviando {symbol} (intento {intento + 1}): {e}")
+                await asyncio.sleep(self.espera * (2 ** intento))
+                continue
+
+            latencia = time.perf_counter() - inicio
+            self.latencias.append((symbol, latencia))
+            metricas.observar("latencia_segundos", latencia, etapa="orden_broker")
+            print(f"⏱️ Orden {side} {symbol} confirmada en {latencia * 1000:.0f} ms")
+            return orden
+
+    async def _buscar_por_cliente(self, symbol, client_order_id):
+        """La orden con ese clientOrderId, o None si el exchange no la tiene."""
+        try:
+            return await self.exchange.fetch_order(None, symbol, params={'clientOrderId': client_order_id})
+        except ccxt.BaseError as e:
+            print(f"⚠️ No se encontró la orden {client_order_id}: {e}")
+            return None
+
+    def resumen_latencias(self):
+        """p50 / p95 / máximo (en segundos) de las últimas órdenes confirmadas."""
+        valores = sorted(l for _, l in self.latencias)
+        if not valores: return {}
+        def percentil(p): return valores[min(len(valores) - 1, int(p * len(valores)))]
+        return {"ordenes": len(valores), "p50": percentil(0.50), "p95": percentil(0.95), "max": valores[-1]}
+
+    async def cerrar(self):
+        await self.exchange.close()
+
+
+# ==========================================================
+# 🧪 EXCHANGE SIMULADO (PAPER TRADING SIN RED)
+# ==========================================================
+# Implementa el subconjunto de ccxt.async_support que usa el bot, así que se
+# enchufa en BrokerAsync en lugar de OKX. Las órdenes se llenan contra velas
+# reproducidas y los takeProfit/stopLoss adjuntos se disparan al avanzar.
+
+class ExchangeSimulado:
+    def __init__(self, latencia=0.0, jitter=0.0, slippage_bps=0.0, capital=10_000.0,
+                 proveedor_velas=None, semilla=42):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.slippage_bps = slippage_bps
+        self.capital = capital
+        self.pnl = 0.0
+        self.proveedor_velas = proveedor_velas  # symbol -> DataFrame OHLCV (o None)
+        self._azar = random.Random(semilla)
+        self._velas = {}     # symbol -> DataFrame OHLCV
+        self._cursor = {}    # symbol -> posición de la vela actual
+        self._ordenes = {}   # id -> orden estilo ccxt
+        self._brackets = []  # posiciones abiertas con TP/SL pendientes
+        self._siguiente_id = 1
+
+    # --- Preparación del escenario ---
+    def cargar_velas(self, symbol, df, inicio=0):
+        self._velas[symbol] = df
+        self._cursor[symbol] = inicio
+
+    def set_sandbox_mode(self, activo):
+        pass
+
+    async def load_markets(self, reload=False):
+        return {s: {'symbol': s, 'active': True, 'limits': {'amount': {'min': 0.0}}} for s in self._velas}
+
+    async def close(self):
+        pass
+
+    # --- Precios ---
+    def _vela(self, symbol):
+        if symbol not in self._velas and self.proveedor_velas:
+            df = self.proveedor_velas(symbol)
+            if df is not None and not df.empty: self.cargar_velas(symbol, df, inicio=len(df) - 1)
+        if symbol not in self._velas:
+            raise ccxt.BadSymbol(f"ExchangeSimulado: sin velas para {symbol}")
+        return self._velas[symbol].iloc[self._cursor[symbol]]
+
+    def _con_slippage(self, precio, side):
+        ajuste = self.slippage_bps / 10_000
+        return precio * (1 + ajuste) if side == 'buy' else precio * (1 - ajuste)
+
+    async def fetch_ticker(self, symbol):
+        vela = self._vela(symbol)
+        return {'symbol': symbol, 'last': float(vela['Close']), 'high': float(vela['High']), 'low': float(vela['Low'])}
+
+    # --- Órdenes ---
+    def _nueva_orden(self, symbol, side, amount, precio, params):
+        orden = {
+            'id': str(self._siguiente_id),
+            'clientOrderId': params.get('clientOrderId'),
+            'symbol': symbol,
+            'type': 'market',
+            'side': side,
+            'amount': amount,
+            'filled': amount,
+            'price': precio,
+            'average': precio,
+            'status': 'closed',
+            'timestamp': int(time.time() * 1000),
+            'info': {'simulado': True},
+        }
+        self._siguiente_id += 1
+        self._ordenes[orden['id']] = orden
+        return orden
+
+    async def create_market_order(self, symbol, side, amount, price=None, params=None):
+        params = params or {}
+        if amount is None or amount <= 0:
+            raise ccxt.InvalidOrder(f"ExchangeSimulado: cantidad inválida {amount}")
+        cid = params.get('clientOrderId')
+        if cid and any(o['clientOrderId'] == cid for o in self._ordenes.values()):
+            raise ccxt.DuplicateOrderId(f"ExchangeSimulado: clientOrderId duplicado {cid}")
+
+        espera = self.latencia + (self._azar.uniform(0, self.jitter) if self.jitter else 0.0)
+        if espera > 0: await asyncio.sleep(espera)
+
+        precio = self._con_slippage(float(self._vela(symbol)['Close']), side)
+        orden = self._nueva_orden(symbol, side, amount, precio, params)
+
+        tp = (params.get('takeProfit') or {}).get('triggerPrice')
+        sl = (params.get('stopLoss') or {}).get('triggerPrice')
+        if tp is not None or sl is not None:
+            self._brackets.append({'orden': orden, 'tp': tp, 'sl': sl})
+        return orden
+
+    async def fetch_order(self, id, symbol=None, params=None):
+        cid = (params or {}).get('clientOrderId')
+        if cid:
+            for orden in self._ordenes.values():
+                if orden['clientOrderId'] == cid: return orden
+            raise ccxt.OrderNotFound(f"ExchangeSimulado: orden con clientOrderId {cid}")
+        if id not in self._ordenes: raise ccxt.OrderNotFound(f"ExchangeSimulado: orden {id}")
+        return self._ordenes[id]
+
+    async def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        """Los TP/SL pendientes se reportan como órdenes trigger abiertas."""
+        abiertas = []
+        for b in self._brackets:
+            if symbol and b['orden']['symbol'] != symbol: continue
+            abiertas.append({'id': b['orden']['id'], 'symbol': b['orden']['symbol'], 'type': 'trigger',
+                             'status': 'open', 'takeProfitPrice': b['tp'], 'stopLossPrice': b['sl']})
+        return abiertas
+
+    async def fetch_balance(self, params=None):
+        total = self.capital + self.pnl
+        return {'USDT': {'free': total, 'used': 0.0, 'total': total}}
+
+    # --- Reproducción de velas ---
+    def avanzar(self, symbol, velas=1):
+        """
+        Mueve el reloj de `symbol` y dispara los TP/SL que toque cada vela.
+        Si una vela toca ambos niveles se asume el stop primero (caso conservador).
+        Devuelve las órdenes de cierre generadas.
+        """
+        cierres = []
+        df = self._velas[symbol]
+        for _ in range(velas):
+            if self._cursor[symbol] >= len(df) - 1: break
+            self._cursor[symbol] += 1
+            vela = df.iloc[self._cursor[symbol]]
+            for b in list(self._brackets):
+                entrada = b['orden']
+                if entrada['symbol'] != symbol: continue
+                largo = entrada['side'] == 'buy'
+                toca_sl = b['sl'] is not None and (vela['Low'] <= b['sl'] if largo else vela['High'] >= b['sl'])
+                toca_tp = b['tp'] is not None and (vela['High'] >= b['tp'] if largo else vela['Low'] <= b['tp'])
+                if not (toca_sl or toca_tp): continue
+
+                lado_cierre = 'sell' if largo else 'buy'
+                precio = self._con_slippage(b['sl'] if toca_sl else b['tp'], lado_cierre)
+                cierre = self._nueva_orden(symbol, lado_cierre, entrada['amount'], precio, {})
+                cierre['info'].update({'cierra': entrada['id'], 'motivo': 'stopLoss' if toca_sl else 'takeProfit'})
+                signo = 1 if largo else -1
+                self.pnl += signo * (precio - entrada['average']) * entrada['amount']
+                self._brackets.remove(b)
+                cierres.append(cierre)
+        return cierres
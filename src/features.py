@@ -1,11 +1,13 @@
 import pandas as pd
-import numpy as np
+from src.indicadores import ema, atr
 
-def preparar_datos(df):
+def preparar_datos(df, copiar=True):
     """
     Calcula indicadores técnicos y niveles de riesgo sin borrar la última vela.
+    Con copiar=False trabaja sobre el mismo df (el llamador ya no lo necesita intacto).
     """
-    df = df.copy()
+    if copiar:
+        df = df.copy()
     
     # --- 1. CORRECCIÓN DE COLUMNAS (Aplanar MultiIndex) ---
     # Yahoo a veces devuelve ('Close', 'BTC-USD'). Lo convertimos a 'Close'.
@@ -27,10 +29,10 @@ def preparar_datos(df):
     rs = gain / loss
     df['RSI'] = 100 - (100 / (1 + rs))
     
-    df['EMA_12'] = df['Close'].ewm(span=12, adjust=False).mean()
-    df['EMA_26'] = df['Close'].ewm(span=26, adjust=False).mean()
+    df['EMA_12'] = ema(df['Close'], 12)
+    df['EMA_26'] = ema(df['Close'], 26)
     df['MACD'] = df['EMA_12'] - df['EMA_26']
-    df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    df['Signal'] = ema(df['MACD'], 9)
     
     # Medias Móviles Flexibles
     # Si tenemos pocos datos, la SMA_200 rompería todo.
@@ -43,12 +45,7 @@ def preparar_datos(df):
     df['Volatilidad'] = df['Close'].rolling(window=20).std()
 
     # --- 3. ATR y STOP LOSS ---
-    high_low = df['High'] - df['Low']
-    high_close = np.abs(df['High'] - df['Close'].shift())
-    low_close = np.abs(df['Low'] - df['Close'].shift())
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = np.max(ranges, axis=1)
-    df['ATR'] = true_range.rolling(14).mean()
+    df['ATR'] = atr(df['High'], df['Low'], df['Close'])
 
     # Rellenar ATR inicial con media simple para no perder datos
     df['ATR'] = df['ATR'].bfill()
@@ -0,0 +1,352 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# --- MOTOR DE INDICADORES ---
+# Todas las fórmulas funcionan igual sobre una Serie (un ticker) o sobre un
+# DataFrame ancho (velas × tickers), así una categoría completa se calcula
+# en una sola pasada vectorizada.
+
+COLUMNAS_OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def ema(x, span):
+    return x.ewm(span=span, adjust=False).mean()
+
+
+def rsi(close, periodo=14):
+    """RSI de Wilder (media exponencial alpha=1/14)."""
+    delta = close.diff()
+    # El primer delta de cada ticker es NaN y cuenta como 0; el relleno previo queda NaN
+    gain = delta.where(delta > 0, 0).where(close.notna())
+    loss = (-delta.where(delta < 0, 0)).where(close.notna())
+    gain = gain.ewm(alpha=1/periodo, adjust=False).mean()
+    loss = loss.ewm(alpha=1/periodo, adjust=False).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def macd(close):
+    linea = ema(close, 12) - ema(close, 26)
+    return linea, ema(linea, 9)
+
+
+def bollinger(close, ventana=20, desviaciones=2):
+    sma = close.rolling(window=ventana).mean()
+    std = close.rolling(window=ventana).std()
+    return sma + (std * desviaciones), sma - (std * desviaciones)
+
+
+def true_range(high, low, close):
+    previo = close.shift()
+    # fmax ignora NaN, igual que el max por filas de pandas en la primera vela
+    return np.fmax(np.fmax(high - low, np.abs(high - previo)), np.abs(low - previo))
+
+
+def atr(high, low, close, ventana=14):
+    return true_range(high, low, close).rolling(ventana).mean()
+
+
+def calcular_columnas(high, low, close):
+    """Devuelve {columna: valores} con todo lo que leen la estrategia y el modelo."""
+    cols = {}
+    cols['RSI'] = rsi(close)
+    cols['MACD'], cols['Signal'] = macd(close)
+    cols['Upper'], cols['Lower'] = bollinger(close)
+    cols['Volatilidad'] = (cols['Upper'] - cols['Lower']) / close
+    cols['ATR'] = atr(high, low, close)
+    cols['EMA_9'] = ema(close, 9)
+    cols['EMA_21'] = ema(close, 21)
+    cols['EMA_50'] = ema(close, 50)
+    cols['SMA_200'] = close.rolling(window=200).mean()
+    cols['Target'] = (close.shift(-1) > close).astype(int)
+    return cols
+
+
+def alinear_por_posicion(barras, campos=COLUMNAS_OHLCV):
+    """
+    Apila {ticker: OHLCV} en matrices (velas × tickers) alineadas por la última vela.
+    Alinear por posición y no por fecha evita huecos entre mercados con distinto
+    horario: cada columna queda igual a la serie del ticker, con NaN solo al inicio.
+    """
+    tickers = list(barras)
+    n = max(len(df) for df in barras.values())
+    matrices = {}
+    for campo in campos:
+        if not all(campo in df.columns for df in barras.values()): continue
+        matriz = np.full((n, len(tickers)), np.nan)
+        for j, t in enumerate(tickers):
+            valores = barras[t][campo].to_numpy(dtype=float)
+            matriz[n - len(valores):, j] = valores
+        matrices[campo] = pd.DataFrame(matriz, columns=tickers)
+    return matrices
+
+
+# --- MODO COMPACTO (float32) ---
+# Opcional: precios e indicadores en una sola matriz float32 por ticker, ordenada por
+# columnas, y el DataFrame solo la envuelve (cada columna es una vista, sin copias).
+# El RandomForest convierte a float32 de todas formas, así que el modelo no pierde nada.
+
+def rellenar_en_sitio(matriz):
+    """bfill y luego ffill por columna, escribiendo sobre la misma matriz."""
+    columnas = np.arange(matriz.shape[1])
+    for vista in (matriz[::-1], matriz):  # bfill = ffill sobre la matriz invertida
+        huecos = np.isnan(vista)
+        if not huecos.any(): continue
+        origen = np.where(huecos, 0, np.arange(len(vista))[:, None])
+        np.maximum.accumulate(origen, axis=0, out=origen)
+        vista[:] = vista[origen, columnas]
+    return matriz
+
+
+def compactar(df, rellenar=True):
+    """Copia única de df a float32 contiguo por columnas; devuelve un DataFrame que la envuelve."""
+    matriz = np.asfortranarray(df.to_numpy(dtype=np.float32))
+    if rellenar: rellenar_en_sitio(matriz)
+    return pd.DataFrame(matriz, index=df.index, columns=df.columns, copy=False)
+
+
+def indicadores_panel(barras, compacto=False):
+    """
+    {ticker: OHLCV} -> {ticker: DataFrame con indicadores}, en una pasada para todos.
+    Equivale a aplicar data_loader.calcular_indicadores a cada ticker por separado.
+    Con compacto=True cada resultado es float32 y se arma directo en su matriz final.
+    """
+    barras = {t: df.dropna() for t, df in barras.items() if df is not None}
+    barras = {t: df for t, df in barras.items() if not df.empty}
+    if not barras: return {}
+
+    matrices = alinear_por_posicion(barras)
+    columnas = calcular_columnas(matrices['High'], matrices['Low'], matrices['Close'])
+    n = len(matrices['Close'])
+
+    resultado = {}
+    for t, df in barras.items():
+        inicio = n - len(df)
+        if compacto:
+            nombres = list(df.columns) + list(columnas)
+            destino = np.empty((len(df), len(nombres)), dtype=np.float32, order='F')
+            destino[:, :df.shape[1]] = df.to_numpy(dtype=np.float32)
+            for j, matriz in enumerate(columnas.values(), start=df.shape[1]):
+                destino[:, j] = matriz[t].to_numpy()[inicio:]
+            resultado[t] = pd.DataFrame(rellenar_en_sitio(destino), index=df.index, columns=nombres, copy=False)
+            continue
+        df = df.copy()
+        for nombre, matriz in columnas.items():
+            df[nombre] = matriz[t].to_numpy()[inicio:]
+        resultado[t] = df.bfill().ffill()
+    return resultado
+
+
+# --- MODO INCREMENTAL (VELAS EN VIVO) ---
+# Mantiene el estado de cada indicador y lo actualiza en O(1) por vela nueva,
+# en vez de recalcular toda la historia con ewm/rolling en cada refresco.
+
+class _Ventana:
+    """Suma y suma de cuadrados de las últimas n observaciones."""
+    def __init__(self, n):
+        self.n = n
+        self.valores = deque()
+        self.suma = 0.0
+        self.suma2 = 0.0
+
+    def agregar(self, x):
+        self.valores.append(x)
+        self.suma += x
+        self.suma2 += x * x
+        if len(self.valores) <= self.n: return None
+        salio = self.valores.popleft()
+        self.suma -= salio
+        self.suma2 -= salio * salio
+        return salio
+
+    def deshacer(self, salio):
+        x = self.valores.pop()
+        self.suma -= x
+        self.suma2 -= x * x
+        if salio is not None:
+            self.valores.appendleft(salio)
+            self.suma += salio
+            self.suma2 += salio * salio
+
+    def media(self):
+        return self.suma / self.n if len(self.valores) == self.n else math.nan
+
+    def std(self):
+        if len(self.valores) < self.n: return math.nan
+        varianza = (self.suma2 - self.suma * self.suma / self.n) / (self.n - 1)
+        return math.sqrt(max(varianza, 0.0))
+
+
+_ESCALARES = ['ultima_fecha', 'cierre_previo', 'ema_9', 'ema_12', 'ema_21', 'ema_26',
+              'ema_50', 'signal', 'media_gain', 'media_loss', 'velas']
+
+
+class EstadoIndicadores:
+    """
+    Estado incremental de un (ticker, intervalo). Si llega otra vez la misma fecha
+    (la vela de 15m todavía se está formando) se deshace la última y se reaplica.
+    """
+    def __init__(self):
+        for nombre in _ESCALARES: setattr(self, nombre, None)
+        self.velas = 0
+        self.bb = _Ventana(20)
+        self.sma_200 = _Ventana(200)
+        self.tr = _Ventana(14)
+        self._previo = None
+
+    @classmethod
+    def desde_historia(cls, df):
+        estado = cls()
+        for fecha, fila in zip(df.index, df[['High', 'Low', 'Close']].to_numpy(dtype=float)):
+            estado.actualizar(fecha, *fila)
+        return estado
+
+    @staticmethod
+    def _suavizar(previo, x, alpha):
+        return x if previo is None else previo + alpha * (x - previo)
+
+    def _deshacer(self):
+        escalares, salidas = self._previo
+        for nombre, valor in zip(_ESCALARES, escalares): setattr(self, nombre, valor)
+        for ventana, salio in zip((self.bb, self.sma_200, self.tr), salidas): ventana.deshacer(salio)
+        self._previo = None
+
+    def actualizar(self, fecha, high, low, close):
+        if self.ultima_fecha is not None and fecha == self.ultima_fecha and self._previo is not None:
+            self._deshacer()
+        elif self.ultima_fecha is not None and fecha < self.ultima_fecha:
+            raise ValueError(f"Vela fuera de orden: {fecha} < {self.ultima_fecha}")
+
+        escalares = tuple(getattr(self, nombre) for nombre in _ESCALARES)
+
+        # RSI de Wilder: el primer delta cuenta como 0
+        delta = 0.0 if self.cierre_previo is None else close - self.cierre_previo
+        self.media_gain = self._suavizar(self.media_gain, max(delta, 0.0), 1/14)
+        self.media_loss = self._suavizar(self.media_loss, max(-delta, 0.0), 1/14)
+
+        for span in (9, 12, 21, 26, 50):
+            nombre = f"ema_{span}"
+            setattr(self, nombre, self._suavizar(getattr(self, nombre), close, 2 / (span + 1)))
+        self.signal = self._suavizar(self.signal, self.ema_12 - self.ema_26, 2 / 10)
+
+        if self.cierre_previo is None: rango = high - low
+        else: rango = max(high - low, abs(high - self.cierre_previo), abs(low - self.cierre_previo))
+        salidas = (self.bb.agregar(close), self.sma_200.agregar(close), self.tr.agregar(rango))
+
+        self._previo = (escalares, salidas)
+        self.cierre_previo = close
+        self.ultima_fecha = fecha
+        self.velas += 1
+        return self.valores()
+
+    def valores(self):
+        """Indicadores de la última vela, con los mismos nombres que calcular_columnas."""
+        if self.velas == 0: return {}
+        cierre = self.cierre_previo
+        media, std = self.bb.media(), self.bb.std()
+        upper, lower = media + std * 2, media - std * 2
+        rs = self.media_gain / self.media_loss if self.media_loss else (math.inf if self.media_gain else math.nan)
+        return {
+            'RSI': 100 - (100 / (1 + rs)),
+            'MACD': self.ema_12 - self.ema_26,
+            'Signal': self.signal,
+            'Upper': upper,
+            'Lower': lower,
+            'Volatilidad': (upper - lower) / cierre,
+            'ATR': self.tr.media(),
+            'EMA_9': self.ema_9,
+            'EMA_21': self.ema_21,
+            'EMA_50': self.ema_50,
+            'SMA_200': self.sma_200.media(),
+        }
+
+
+# Columnas que arrastran la semilla de una media exponencial (EMA o Wilder) y su escala:
+# "precio" = del orden del cierre, si no un valor fijo (el RSI va de 0 a 100)
+COLUMNAS_CON_SEMILLA = {'RSI': 100.0, 'MACD': "precio", 'Signal': "precio",
+                        'EMA_9': "precio", 'EMA_21': "precio", 'EMA_50': "precio"}
+ALPHA_MAS_LENTO = 2 / 51  # EMA_50: la semilla que más tarda en olvidarse
+
+
+def verificar_estado(estado, df, tolerancia=1e-6):
+    """
+    Compara el estado incremental con el cálculo por lote sobre las velas de `df`.
+    Devuelve {columna: (incremental, lote)} con las que difieren más de `tolerancia` (relativa).
+    Si el estado arrancó antes que `df` (historia recortada), las medias exponenciales
+    parten de otra semilla: a las columnas que la arrastran se les tolera lo que esa
+    semilla todavía pesa tras len(df) velas, (1 - alpha)^(n-1) veces su escala.
+    """
+    lote = calcular_columnas(df['High'], df['Low'], df['Close'])
+    olvido = (1 - ALPHA_MAS_LENTO) ** max(len(df) - 1, 0)
+    precio = abs(float(df['Close'].iloc[-1]))
+    diferencias = {}
+    for nombre, valor in estado.valores().items():
+        esperado = float(lote[nombre].iloc[-1])
+        if math.isnan(valor) and math.isnan(esperado): continue
+        margen = tolerancia * 1e-3
+        if nombre in COLUMNAS_CON_SEMILLA:
+            escala = COLUMNAS_CON_SEMILLA[nombre]
+            margen = max(margen, olvido * (precio if escala == "precio" else escala))
+        if not math.isclose(valor, esperado, rel_tol=tolerancia, abs_tol=margen):
+            diferencias[nombre] = (valor, esperado)
+    return diferencias
+
+
+VERIFICAR_CADA = 100  # velas nuevas entre comparaciones del estado contra el cálculo por lote
+
+
+class IndicadoresEnVivo:
+    """
+    Estados incrementales por (ticker, intervalo). Cada `verificar_cada` velas nuevas, y
+    la primera vez que se reescribe cada vela en formación, el estado se compara con
+    el cálculo por lote; si se desvió, se reconstruye desde la historia.
+    """
+    def __init__(self, verificar_cada=VERIFICAR_CADA, tolerancia=1e-6):
+        self.verificar_cada = verificar_cada
+        self.tolerancia = tolerancia
+        self._estados = {}
+        self._sin_verificar = {}  # clave -> velas nuevas desde la última verificación
+        self._reescrita = {}      # clave -> fecha de la última vela en formación ya verificada
+        self.reconstrucciones = 0
+
+    def sincronizar(self, ticker, intervalo, df):
+        """
+        Aplica a su estado solo las velas de `df` que aún no vio y devuelve los
+        indicadores de la última. Si no hay estado o las velas no empalman, se
+        reconstruye desde la historia completa.
+        """
+        df = df.dropna(subset=['High', 'Low', 'Close'])
+        if df.empty: return {}
+        clave = (ticker, intervalo)
+        estado = self._estados.get(clave)
+
+        if estado is None or estado.ultima_fecha not in df.index:
+            return self._reconstruir(clave, df)
+
+        # Reaplicamos también la última vela conocida por si cambió mientras se formaba
+        pendientes = df[df.index >= estado.ultima_fecha]
+        formando = estado.ultima_fecha
+        reescrita = float(pendientes['Close'].iloc[0]) != estado.cierre_previo
+        for fecha, fila in zip(pendientes.index, pendientes[['High', 'Low', 'Close']].to_numpy(dtype=float)):
+            estado.actualizar(fecha, *fila)
+
+        self._sin_verificar[clave] = self._sin_verificar.get(clave, 0) + len(pendientes) - 1
+        toca = self._sin_verificar[clave] >= self.verificar_cada
+        if reescrita and self._reescrita.get(clave) != formando:
+            self._reescrita[clave] = formando
+            toca = True
+        if toca:
+            self._sin_verificar[clave] = 0
+            diferencias = verificar_estado(estado, df, self.tolerancia)
+            if diferencias:
+                print(f"⚠️ Estado incremental de {ticker} ({intervalo}) desviado en {sorted(diferencias)}: se reconstruye")
+                self.reconstrucciones += 1
+                return self._reconstruir(clave, df)
+        return estado.valores()
+
+    def _reconstruir(self, clave, df):
+        estado = EstadoIndicadores.desde_historia(df)
+        self._estados[clave] = estado
+        self._sin_verificar[clave] = 0
+        return estado.valores()
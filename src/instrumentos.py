@@ -0,0 +1,115 @@
+import os
+import json
+import math
+from ccxt.base.decimal_to_precision import TICK_SIZE, DECIMAL_PLACES
+from src.universo import universo
+
+# --- METADATOS POR INSTRUMENTO ---
+# Símbolo del broker, tick de precio, paso de lote y tamaño mínimo por ticker. Se arman
+# una vez con el maestro de instrumentos y se completan con load_markets del broker
+# (o con la última foto guardada en disco si el broker no responde). Las señales viajan
+# como floats y solo se formatean al mostrarlas.
+ARCHIVO_INSTRUMENTOS = os.getenv("CACHE_INSTRUMENTOS", os.path.join("cache", "instrumentos.json"))
+CAMPOS_INSTRUMENTO = ("broker", "tick", "paso_lote", "min_lote")
+
+
+def decimales_de_tick(tick):
+    """0.001 -> 3, 0.5 -> 1, 1 -> 0."""
+    if not tick or tick <= 0: return None
+    return max(0, -math.floor(math.log10(tick) + 1e-9))
+
+
+def _decimales_por_precio(precio):
+    # Sin tick conocido (cripto antes de load_markets): según la magnitud del precio
+    if precio < 0.001: return 8
+    return 4 if precio < 50 else 2
+
+
+def _a_tick(valor, modo):
+    """ccxt expresa la precisión como tick (TICK_SIZE) o como cantidad de decimales (DECIMAL_PLACES)."""
+    if valor is None: return None
+    return 10.0 ** -valor if modo == DECIMAL_PLACES else float(valor)
+
+
+class MetadatosInstrumentos:
+    def __init__(self, archivo=None):
+        self.archivo = archivo or ARCHIVO_INSTRUMENTOS
+        self._datos = {}       # ticker -> {"broker", "tick", "paso_lote", "min_lote", "decimales"}
+        self._por_broker = {}  # símbolo del broker -> ticker
+        for ticker in set(universo.broker) | set(universo.tick):
+            self.fijar(ticker, broker=universo.broker.get(ticker), tick=universo.tick.get(ticker))
+        self.cargar_snapshot()
+
+    def fijar(self, ticker, **campos):
+        entrada = self._datos.setdefault(ticker, {c: None for c in CAMPOS_INSTRUMENTO})
+        entrada.update({c: v for c, v in campos.items() if c in CAMPOS_INSTRUMENTO and v is not None})
+        entrada["decimales"] = decimales_de_tick(entrada["tick"])
+        if entrada["broker"]: self._por_broker[entrada["broker"]] = ticker
+
+    # --- Fuentes ---
+    def cargar_mercados(self, mercados, modo=TICK_SIZE):
+        """Completa tick / paso de lote / mínimo con la respuesta de load_markets y guarda la foto."""
+        actualizados = 0
+        for ticker, entrada in self._datos.items():
+            mercado = mercados.get(entrada["broker"]) if entrada["broker"] else None
+            if not mercado: continue
+            precision = mercado.get('precision') or {}
+            minimo = ((mercado.get('limits') or {}).get('amount') or {}).get('min')
+            self.fijar(ticker, tick=_a_tick(precision.get('price'), modo),
+                       paso_lote=_a_tick(precision.get('amount'), modo), min_lote=minimo)
+            actualizados += 1
+        if actualizados: self.guardar_snapshot()
+        return actualizados
+
+    def cargar_snapshot(self):
+        if not os.path.exists(self.archivo): return
+        try:
+            with open(self.archivo, encoding="utf-8") as f: foto = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Foto de instrumentos corrupta ({self.archivo}): {e}")
+            return
+        for ticker, campos in foto.items(): self.fijar(ticker, **campos)
+
+    def guardar_snapshot(self):
+        os.makedirs(os.path.dirname(self.archivo) or ".", exist_ok=True)
+        temporal = self.archivo + ".tmp"
+        foto = {t: {c: e[c] for c in CAMPOS_INSTRUMENTO} for t, e in self._datos.items()}
+        with open(temporal, "w", encoding="utf-8") as f: json.dump(foto, f, indent=1)
+        os.replace(temporal, self.archivo)
+
+    # --- Consultas ---
+    def simbolo_broker(self, ticker):
+        entrada = self._datos.get(ticker)
+        return entrada["broker"] if entrada else None
+
+    def ticker_de(self, simbolo_broker):
+        return self._por_broker.get(simbolo_broker)
+
+    def decimales(self, ticker, precio):
+        entrada = self._datos.get(ticker)
+        if entrada and entrada["decimales"] is not None: return entrada["decimales"]
+        return _decimales_por_precio(abs(precio))
+
+    def formatear_precio(self, ticker, precio):
+        if precio is None: return "-"
+        return format(precio, f",.{self.decimales(ticker, precio)}f")
+
+    def redondear_precio(self, ticker, precio):
+        """Precio al tick del instrumento (el broker rechaza triggers fuera de tick)."""
+        entrada = self._datos.get(ticker)
+        tick = entrada["tick"] if entrada else None
+        if not tick: return precio
+        return round(round(precio / tick) * tick, decimales_de_tick(tick))
+
+    def ajustar_cantidad(self, ticker, cantidad):
+        """Cantidad recortada al paso de lote; ValueError si queda bajo el mínimo del broker."""
+        entrada = self._datos.get(ticker) or {}
+        paso, minimo = entrada.get("paso_lote"), entrada.get("min_lote")
+        if paso:
+            cantidad = round(math.floor(cantidad / paso + 1e-9) * paso, decimales_de_tick(paso))
+        if minimo and cantidad < minimo:
+            raise ValueError(f"Cantidad {cantidad} menor al mínimo de {entrada.get('broker') or ticker} ({minimo})")
+        return cantidad
+
+
+metadatos = MetadatosInstrumentos()
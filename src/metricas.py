@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+
+# ==========================================================
+# 📈 MÉTRICAS INTERNAS (LATENCIAS, CONTADORES Y CACHES)
+# ==========================================================
+# Histogramas de latencia por etapa, contadores con etiquetas y tasas de acierto de
+# las caches registradas. Se exponen en texto Prometheus (METRICAS_PUERTO) y/o en un
+# volcado JSON periódico (METRICAS_JSON). Sin configurar, solo se acumulan en memoria.
+PUERTO_METRICAS = int(os.getenv("METRICAS_PUERTO", "0"))  # 0 = sin endpoint HTTP
+ARCHIVO_METRICAS = os.getenv("METRICAS_JSON")             # ruta del volcado, None = sin volcado
+INTERVALO_VOLCADO = float(os.getenv("METRICAS_INTERVALO", "60"))
+PREFIJO = "cazador"
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _etiquetas(etiquetas):
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _formato_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+class _Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * len(limites)  # no acumuladas; se acumulan al exportar
+        self.suma = 0.0
+        self.cuenta = 0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.cuenta += 1
+        self.maximo = max(self.maximo, valor)
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cubetas[i] += 1
+                break
+
+    def percentil(self, p):
+        """Aproximado: el límite de la cubeta donde cae el percentil."""
+        if not self.cuenta: return None
+        objetivo, acumulado = p * self.cuenta, 0
+        for limite, n in zip(self.limites, self.cubetas):
+            acumulado += n
+            if acumulado >= objetivo: return min(limite, self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = limites
+        self._candado = threading.Lock()  # se registra desde hilos del pool de descargas
+        self.contadores = {}   # (nombre, etiquetas) -> valor
+        self.histogramas = {}  # (nombre, etiquetas) -> _Histograma
+        self.caches = {}       # nombre -> función que devuelve (aciertos, fallos)
+        self.inicio = time.time()
+        self._tareas = []
+
+    # --- Registro ---
+    def contar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._candado:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, segundos, **etiquetas):
+        clave = (nombre, _etiquetas(etiquetas))
+        with self._candado:
+            if clave not in self.histogramas: self.histogramas[clave] = _Histograma(self.limites)
+            self.histogramas[clave].observar(segundos)
+
+    @contextmanager
+    def cronometrar(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.contar("errores", etapa=etapa)
+            raise
+        finally:
+            self.observar("latencia_segundos", time.perf_counter() - inicio, etapa=etapa)
+
+    def medir(self, etapa):
+        """Decorador (funciones normales o async) que registra la latencia y los errores de `etapa`."""
+        def decorador(funcion):
+            if asyncio.iscoroutinefunction(funcion):
+                @functools.wraps(funcion)
+                async def envoltura(*args, **kwargs):
+                    with self.cronometrar(etapa): return await funcion(*args, **kwargs)
+            else:
+                @functools.wraps(funcion)
+                def envoltura(*args, **kwargs):
+                    with self.cronometrar(etapa): return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def promedio(self, nombre, **etiquetas):
+        """Media de un histograma (None si todavía no tiene observaciones)."""
+        with self._candado:
+            h = self.histogramas.get((nombre, _etiquetas(etiquetas)))
+            return h.suma / h.cuenta if h and h.cuenta else None
+
+    def registrar_cache(self, nombre, cache):
+        """`cache` debe tener contadores .aciertos y .fallos (p. ej. CacheTTL); se leen al exportar."""
+        self.caches[nombre] = lambda: (cache.aciertos, cache.fallos)
+
+    # --- Exportación ---
+    def instantanea(self):
+        with self._candado:
+            contadores = [{"nombre": n, "etiquetas": dict(e), "valor": v} for (n, e), v in self.contadores.items()]
+            histogramas = [{
+                "nombre": n, "etiquetas": dict(e), "cuenta": h.cuenta, "suma": round(h.suma, 6),
+                "p50": h.percentil(0.50), "p95": h.percentil(0.95), "max": round(h.maximo, 6),
+            } for (n, e), h in self.histogramas.items()]
+        caches = {}
+        for nombre, leer in self.caches.items():
+            aciertos, fallos = leer()
+            total = aciertos + fallos
+            caches[nombre] = {"aciertos": aciertos, "fallos": fallos, "tasa_aciertos": aciertos / total if total else None}
+        return {"desde": self.inicio, "ahora": time.time(), "contadores": contadores,
+                "histogramas": histogramas, "caches": caches}
+
+    def texto_prometheus(self):
+        lineas = []
+        with self._candado:
+            for nombre in sorted({n for n, _ in self.contadores}):
+                lineas.append(f"# TYPE {PREFIJO}_{nombre}_total counter")
+                for (n, e), v in self.contadores.items():
+                    if n == nombre: lineas.append(f"{PREFIJO}_{n}_total{_formato_etiquetas(e)} {v}")
+            for nombre in sorted({n for n, _ in self.histogramas}):
+                lineas.append(f"# TYPE {PREFIJO}_{nombre} histogram")
+                for (n, e), h in self.histogramas.items():
+                    if n != nombre: continue
+                    acumulado = 0
+                    for limite, cuenta in zip(h.limites, h.cubetas):
+                        acumulado += cuenta
+                        lineas.append(f"{PREFIJO}_{n}_bucket{_formato_etiquetas(e, [('le', limite)])} {acumulado}")
+                    lineas.append(f"{PREFIJO}_{n}_bucket{_formato_etiquetas(e, [('le', '+Inf')])} {h.cuenta}")
+                    lineas.append(f"{PREFIJO}_{n}_sum{_formato_etiquetas(e)} {h.suma}")
+                    lineas.append(f"{PREFIJO}_{n}_count{_formato_etiquetas(e)} {h.cuenta}")
+        if self.caches:
+            lineas.append(f"# TYPE {PREFIJO}_cache_aciertos_total counter")
+            lineas.append(f"# TYPE {PREFIJO}_cache_fallos_total counter")
+            for nombre, leer in self.caches.items():
+                aciertos, fallos = leer()
+                lineas.append(f'{PREFIJO}_cache_aciertos_total{{cache="{nombre}"}} {aciertos}')
+                lineas.append(f'{PREFIJO}_cache_fallos_total{{cache="{nombre}"}} {fallos}')
+        return "\n".join(lineas) + "\n"
+
+    def volcar_json(self, ruta):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f: json.dump(self.instantanea(), f, indent=1)
+        os.replace(temporal, ruta)
+
+    # --- Publicación ---
+    async def _responder(self, lector, escritor):
+        try:
+            await asyncio.wait_for(lector.readuntil(b"\r\n\r\n"), timeout=5)
+            cuerpo = self.texto_prometheus().encode("utf-8")
+            escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                           b"Content-Length: " + str(len(cuerpo)).encode() + b"\r\nConnection: close\r\n\r\n" + cuerpo)
+            await escritor.drain()
+        except Exception: pass
+        finally:
+            escritor.close()
+
+    async def _volcar_periodicamente(self, ruta, intervalo):
+        while True:
+            await asyncio.sleep(intervalo)
+            try: await asyncio.to_thread(self.volcar_json, ruta)
+            except Exception as e: print(f"⚠️ No se pudo volcar métricas a {ruta}: {e}")
+
+    async def iniciar(self, puerto=PUERTO_METRICAS, archivo=ARCHIVO_METRICAS, intervalo=INTERVALO_VOLCADO):
+        """Arranca el endpoint /metrics y/o el volcado JSON según la configuración. Idempotente."""
+        if self._tareas: return
+        if puerto:
+            servidor = await asyncio.start_server(self._responder, "0.0.0.0", puerto)
+            self._tareas.append(asyncio.create_task(servidor.serve_forever()))
+            print(f"📈 Métricas en http://0.0.0.0:{puerto}/metrics")
+        if archivo:
+            self._tareas.append(asyncio.create_task(self._volcar_periodicamente(archivo, intervalo)))
+
+
+metricas = Metricas()
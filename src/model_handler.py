@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 
@@ -38,6 +39,25 @@ class Predictor:
             print(f"⚠️ Error interno entrenando: {e}")
             self.entrenado = False
 
+    def predecir_lote(self, data):
+        """
+        Devuelve (Predicciones, Probabilidades) de todas las filas de `data`.
+        Un solo predict_proba: la clase se deriva de las probabilidades.
+        """
+        n = len(data)
+        clases = list(self.model.classes_) if self.entrenado else []
+        # Sin entrenar o con una sola clase en el target: Neutral (50%)
+        if len(clases) < 2:
+            return np.zeros(n, dtype=int), np.full(n, 0.5)
+
+        features = ['RSI', 'MACD', 'Signal', 'SMA_50', 'SMA_200', 'Volatilidad']
+        features_reales = [f for f in features if f in data.columns]
+
+        proba = self.model.predict_proba(data[features_reales])
+        predicciones = np.asarray(clases)[proba.argmax(axis=1)]
+        probabilidades = proba[:, clases.index(1)]
+        return predicciones, probabilidades
+
     def predecir_mañana(self, data):
         """
         Devuelve (Predicción, Probabilidad)
@@ -47,14 +67,7 @@ class Predictor:
             return 0, 0.5
 
         try:
-            features = ['RSI', 'MACD', 'Signal', 'SMA_50', 'SMA_200', 'Volatilidad']
-            features_reales = [f for f in features if f in data.columns]
-            
-            ultimo_dato = data[features_reales].iloc[[-1]]
-            
-            prediccion = self.model.predict(ultimo_dato)[0]
-            probabilidad = self.model.predict_proba(ultimo_dato)[0][1]
-            
-            return prediccion, probabilidad
+            predicciones, probabilidades = self.predecir_lote(data.iloc[[-1]])
+            return predicciones[0], probabilidades[0]
         except:
             return 0, 0.5
@@ -0,0 +1,84 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.strategy import examinar_activo, registro
+from src.metricas import metricas
+
+# --- MOTOR DE EVALUACIÓN EN PARALELO ---
+# examinar_activo es puro CPU (pandas + RandomForest). Lo repartimos en un pool
+# de procesos para no bloquear el event loop de Discord. Cada proceso guarda su
+# propia cache de modelos, así que por defecto no se usan más de TOPE_PROCESOS.
+TOPE_PROCESOS = 4
+MAX_PROCESOS = max(1, int(os.getenv("MAX_PROCESOS", str(min(TOPE_PROCESOS, os.cpu_count() or 1)))))
+# Hacer fork con los hilos de discord/asyncio ya corriendo no es seguro: los hijos arrancan limpios
+CONTEXTO_PROCESOS = os.getenv("CONTEXTO_PROCESOS",
+                              "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+_pool_procesos = None
+
+def _obtener_pool():
+    global _pool_procesos
+    if _pool_procesos is None:
+        _pool_procesos = ProcessPoolExecutor(max_workers=MAX_PROCESOS, mp_context=multiprocessing.get_context(CONTEXTO_PROCESOS))
+    return _pool_procesos
+
+def _reiniciar_pool(roto):
+    """Un hijo que muere (OOM, segfault) rompe el pool para siempre: se descarta y se arma otro."""
+    global _pool_procesos
+    roto.shutdown(wait=False, cancel_futures=True)
+    if _pool_procesos is not roto: return  # otro evaluador ya lo reemplazó
+    _pool_procesos = None
+    metricas.contar("pool_reiniciado")
+    print("⚠️ Pool de evaluación roto: se reinicia")
+
+def _evaluar(trabajo):
+    """
+    Corre en el proceso hijo. Nunca lanza: un ticker roto no tumba el lote.
+    Devuelve (resultado, telemetría): las métricas del hijo se registran en el proceso principal.
+    """
+    ticker, df, estilo, categoria = trabajo
+    aciertos, entrenamientos = registro.aciertos, registro.entrenamientos
+    inicio = time.perf_counter()
+    error = False
+    try:
+        info, prob = examinar_activo(df, ticker, estilo, categoria)
+    except Exception as e:
+        print(f"⚠️ Error evaluando {ticker} ({estilo}): {e}")
+        info, prob, error = None, 0.0, True
+    telemetria = (time.perf_counter() - inicio, registro.aciertos - aciertos, registro.entrenamientos - entrenamientos, error)
+    return (ticker, estilo, categoria, info, prob), telemetria
+
+def _registrar(telemetria):
+    segundos, aciertos, entrenamientos, error = telemetria
+    metricas.observar("latencia_segundos", segundos, etapa="examinar_activo")
+    if aciertos: metricas.contar("modelos", aciertos, origen="cache")
+    if entrenamientos: metricas.contar("modelos", entrenamientos, origen="entrenado")
+    if error: metricas.contar("errores", etapa="examinar_activo")
+
+async def _en_pool(trabajo):
+    loop = asyncio.get_running_loop()
+    with metricas.cronometrar("evaluacion"):  # incluye el viaje al proceso hijo
+        pool = _obtener_pool()
+        try:
+            resultado, telemetria = await loop.run_in_executor(pool, _evaluar, trabajo)
+        except BrokenProcessPool:
+            # Un solo reintento con pool nuevo; si vuelve a romperse, el error sube al llamador
+            _reiniciar_pool(pool)
+            resultado, telemetria = await loop.run_in_executor(_obtener_pool(), _evaluar, trabajo)
+    _registrar(telemetria)
+    return resultado
+
+async def evaluar_uno(ticker, df, estilo="SCALPING", categoria="GENERAL"):
+    _, _, _, info, prob = await _en_pool((ticker, df, estilo, categoria))
+    return info, prob
+
+async def evaluar_lote(trabajos):
+    """
+    Recibe trabajos (ticker, df, estilo, categoria) y va entregando
+    (ticker, estilo, categoria, info, prob) a medida que cada uno termina.
+    """
+    for futuro in asyncio.as_completed([_en_pool(t) for t in trabajos]):
+        yield await futuro
@@ -0,0 +1,108 @@
+import os
+import json
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from src.cache_ttl import CacheTTL
+from src.metricas import metricas
+
+# --- LECTOR DE FEEDS RSS ---
+# Pide el feed con ETag/Last-Modified (un 304 no trae cuerpo), lo parsea en streaming
+# y corta en el primer item ya visto. Los vistos viven en una LRU con TTL que se
+# guarda en disco, así un reinicio no vuelve a publicar el boletín.
+ARCHIVO_NOTICIAS = os.getenv("CACHE_NOTICIAS", os.path.join("cache", "noticias_rss.json"))
+CAPACIDAD_VISTOS = int(os.getenv("CAPACIDAD_NOTICIAS", "2000"))
+TTL_VISTOS = float(os.getenv("TTL_NOTICIAS", str(7 * 86400)))
+TIMEOUT_RSS = float(os.getenv("TIMEOUT_RSS", "15"))
+
+
+def _texto(item, etiqueta):
+    nodo = item.find(etiqueta)
+    return nodo.text if nodo is not None and nodo.text else None
+
+
+class LectorRSS:
+    def __init__(self, url, archivo=None, capacidad=CAPACIDAD_VISTOS, ttl=TTL_VISTOS):
+        self.url = url
+        self.archivo = archivo or ARCHIVO_NOTICIAS
+        self.vistos = CacheTTL(capacidad=capacidad, ttl=ttl)
+        self.etag = None
+        self.modificado = None
+        self.sin_cambios = 0  # respuestas 304
+        self._candado = threading.Lock()
+        self._cargar()
+
+    # --- Persistencia ---
+    def _cargar(self):
+        if not os.path.exists(self.archivo): return
+        try:
+            with open(self.archivo, encoding="utf-8") as f: estado = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Estado de noticias corrupto ({self.archivo}): {e}")
+            return
+        self.etag = estado.get("etag")
+        self.modificado = estado.get("modificado")
+        self.vistos.importar(estado.get("vistos", []))
+
+    def _guardar(self):
+        os.makedirs(os.path.dirname(self.archivo) or ".", exist_ok=True)
+        temporal = self.archivo + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"etag": self.etag, "modificado": self.modificado, "vistos": self.vistos.exportar()}, f)
+        os.replace(temporal, self.archivo)  # escritura atómica
+
+    # --- Sondeo ---
+    def _pedir(self):
+        """Respuesta HTTP abierta, o None si el feed no cambió (304)."""
+        cabeceras = {'User-Agent': 'Mozilla/5.0'}
+        if self.etag: cabeceras['If-None-Match'] = self.etag
+        if self.modificado: cabeceras['If-Modified-Since'] = self.modificado
+        try:
+            return urllib.request.urlopen(urllib.request.Request(self.url, headers=cabeceras), timeout=TIMEOUT_RSS)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                self.sin_cambios += 1
+                metricas.contar("rss", respuesta="304")
+                return None
+            raise
+
+    def sondear(self, maximo=3):
+        """
+        Items nuevos del feed (los más frescos primero), como dicts con titulo, link y
+        descripcion. Todos los nuevos quedan marcados como vistos, pero solo se devuelven
+        los `maximo` más frescos (anti-spam).
+        """
+        with self._candado:
+            respuesta = self._pedir()
+            if respuesta is None: return []
+
+            metricas.contar("rss", respuesta="200")
+            nuevas = []
+            with respuesta:
+                etag = respuesta.headers.get('ETag')
+                modificado = respuesta.headers.get('Last-Modified')
+                for _, elemento in ET.iterparse(respuesta, events=("end",)):
+                    if elemento.tag != "item": continue
+                    link = _texto(elemento, 'link')
+                    clave = _texto(elemento, 'guid') or link
+                    if clave is None:
+                        elemento.clear()
+                        continue
+                    if clave in self.vistos: break  # de aquí para abajo ya se publicó
+                    nuevas.append({
+                        "titulo": _texto(elemento, 'title') or "",
+                        "link": link,
+                        "descripcion": _texto(elemento, 'description'),
+                    })
+                    self.vistos.guardar(clave, True)
+                    elemento.clear()
+
+            metricas.contar("noticias_nuevas", len(nuevas))
+            self.etag, self.modificado = etag, modificado
+            self._guardar()
+            return nuevas[:maximo]
+
+    async def nuevas(self, maximo=3):
+        return await asyncio.to_thread(self.sondear, maximo)
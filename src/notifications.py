@@ -1,23 +1,225 @@
-import requests
 import os
+import time
+import asyncio
+import requests
+import aiohttp
+import discord
+from discord.ui import View, Button
+from src.metricas import metricas
 
-def enviar_telegram(mensaje):
+# ==========================================================
+# 📨 DESPACHADOR DE NOTIFICACIONES
+# ==========================================================
+# Las alertas se encolan y salen en segundo plano: quien genera la señal no espera
+# a Discord ni a Telegram. Cada destino tiene su propia cola y su ritmo, y lo que se
+# acumula mientras tanto sale agrupado en un solo mensaje.
+INTERVALO_DISCORD = float(os.getenv("INTERVALO_DISCORD", "1.0"))    # segundos mínimos entre mensajes a un canal
+INTERVALO_TELEGRAM = float(os.getenv("INTERVALO_TELEGRAM", "1.0"))  # Telegram admite ~1 mensaje/s por chat
+VENTANA_NOTIFICACIONES = float(os.getenv("VENTANA_NOTIFICACIONES", "2.0"))  # espera para juntar mensajes
+TIMEOUT_TELEGRAM = float(os.getenv("TIMEOUT_TELEGRAM", "10"))
+TAMANO_COLA_NOTIFICACIONES = 256
+MAX_EMBEDS = 10             # límite de Discord por mensaje
+MAX_TEXTO_EMBEDS = 6000     # límite de Discord para el texto sumado de los embeds de un mensaje
+MAX_BOTONES = 25            # límite de Discord por vista
+MAX_TEXTO_TELEGRAM = 4096   # límite de Telegram por mensaje
+REINTENTOS_TELEGRAM = 3
+
+# Sesión compartida (keep-alive) para los envíos síncronos
+_sesion_http = requests.Session()
+
+
+def _credenciales_telegram():
     token = os.getenv("TELEGRAM_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
-    
     if not token or not chat_id:
         print("❌ Error: Faltan credenciales de Telegram en .env")
-        return
+        return None
+    return f"https://api.telegram.org/bot{token}/sendMessage", chat_id
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+
+def enviar_telegram(mensaje):
+    credenciales = _credenciales_telegram()
+    if not credenciales: return
+    url, chat_id = credenciales
     payload = {
         "chat_id": chat_id,
         "text": mensaje,
         "parse_mode": "Markdown"
     }
-    
+
     try:
-        requests.post(url, json=payload)
+        respuesta = _sesion_http.post(url, json=payload, timeout=TIMEOUT_TELEGRAM)
+        respuesta.raise_for_status()
         print("📨 Notificación enviada.")
     except Exception as e:
         print(f"Error enviando Telegram: {e}")
+
+
+def _trozos_telegram(mensajes):
+    """Une los mensajes en los menos envíos posibles sin pasar MAX_TEXTO_TELEGRAM."""
+    trozos, actual = [], ""
+    for m in mensajes:
+        m = m[:MAX_TEXTO_TELEGRAM]
+        if actual and len(actual) + 2 + len(m) > MAX_TEXTO_TELEGRAM:
+            trozos.append(actual)
+            actual = ""
+        actual = f"{actual}\n\n{m}" if actual else m
+    if actual: trozos.append(actual)
+    return trozos
+
+
+def _grupos_discord(lote):
+    """Parte el lote en mensajes de hasta MAX_EMBEDS embeds y MAX_TEXTO_EMBEDS caracteres."""
+    grupos, actual, texto = [], [], 0
+    for item in lote:
+        largo = len(item[0])
+        if actual and (len(actual) >= MAX_EMBEDS or texto + largo > MAX_TEXTO_EMBEDS):
+            grupos.append(actual)
+            actual, texto = [], 0
+        actual.append(item)
+        texto += largo
+    if actual: grupos.append(actual)
+    return grupos
+
+
+def _unir_vistas(lote):
+    """
+    Una sola vista con copias de los botones de cada señal, etiquetadas con su ticker.
+    Las vistas originales quedan intactas por si hay que mandar las señales por separado.
+    """
+    unida = View(timeout=None)
+    for _, vista, etiqueta in lote:
+        if vista is None: continue
+        for item in vista.children:
+            if len(unida.children) >= MAX_BOTONES: break
+            etiqueta_boton = f"{etiqueta} · {item.label}" if etiqueta else item.label
+            copia = Button(label=etiqueta_boton, style=item.style, disabled=item.disabled, emoji=item.emoji, url=item.url)
+            copia.callback = item.callback
+            unida.add_item(copia)
+    return unida if unida.children else None
+
+
+class Despachador:
+    def __init__(self, ventana=VENTANA_NOTIFICACIONES):
+        self.ventana = ventana
+        self._destinos = {}  # clave -> (cola, tarea)
+        self._sesion = None  # aiohttp.ClientSession compartida (Telegram)
+        self.enviados = 0
+        self.mensajes = 0
+        self.errores = 0
+
+    # --- Cola por destino ---
+    async def _encolar(self, clave, item, enviar, intervalo, max_lote, etapa):
+        if clave not in self._destinos:
+            cola = asyncio.Queue(maxsize=TAMANO_COLA_NOTIFICACIONES)
+            tarea = asyncio.create_task(self._trabajar(cola, enviar, intervalo, max_lote, etapa))
+            self._destinos[clave] = (cola, tarea)
+        await self._destinos[clave][0].put(item)
+
+    async def _trabajar(self, cola, enviar, intervalo, max_lote, etapa):
+        ultimo_envio = 0.0
+        while True:
+            lote = [await cola.get()]
+            limite = time.monotonic() + self.ventana
+            while len(lote) < max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0: break
+                try: lote.append(await asyncio.wait_for(cola.get(), timeout=restante))
+                except asyncio.TimeoutError: break
+
+            espera = ultimo_envio + intervalo - time.monotonic()
+            if espera > 0: await asyncio.sleep(espera)
+            while len(lote) < max_lote and not cola.empty():
+                lote.append(cola.get_nowait())
+
+            try:
+                # `enviar` puede devolver cuántos ítems no logró mandar (ya reportados)
+                with metricas.cronometrar(etapa): fallidos = await enviar(lote) or 0
+                self.enviados += len(lote) - fallidos
+                self.errores += fallidos
+                self.mensajes += 1
+                metricas.contar("notificaciones", len(lote) - fallidos, etapa=etapa)
+            except Exception as e:
+                self.errores += len(lote)
+                print(f"❌ Error enviando notificación: {e}")
+            ultimo_envio = time.monotonic()
+            for _ in lote: cola.task_done()
+
+    # --- Discord ---
+    async def discord(self, canal, embed, vista=None, etiqueta=None):
+        """
+        Encola un embed para `canal`. Si se juntan varios, salen en un solo mensaje
+        (respetando los límites de cantidad y de texto) y sus botones se unen en una
+        vista, prefijados con `etiqueta`.
+        """
+        async def mandar(grupo):
+            vista_final = grupo[0][1] if len(grupo) == 1 else _unir_vistas(grupo)
+            # discord.py ya respeta los buckets de rate limit y reintenta los 429
+            if vista_final is None: await canal.send(embeds=[e for e, _, _ in grupo])
+            else: await canal.send(embeds=[e for e, _, _ in grupo], view=vista_final)
+
+        async def enviar(lote):
+            fallidos = 0
+            for grupo in _grupos_discord(lote):
+                try:
+                    await mandar(grupo)
+                    continue
+                except discord.HTTPException as e:
+                    print(f"⚠️ Discord rechazó un lote de {len(grupo)} embeds ({e}): se reintenta")
+                await asyncio.sleep(INTERVALO_DISCORD)
+                try:
+                    await mandar(grupo)
+                    continue
+                except discord.HTTPException: pass
+                # Segundo fallo: cada embed por su cuenta, así uno inválido no arrastra al resto
+                for item in grupo:
+                    try: await mandar([item])
+                    except discord.HTTPException as e:
+                        fallidos += 1
+                        print(f"❌ No se pudo enviar la alerta {item[2] or ''} a Discord: {e}")
+            return fallidos
+
+        await self._encolar(("discord", canal.id), (embed, vista, etiqueta), enviar, INTERVALO_DISCORD, MAX_EMBEDS, "envio_discord")
+
+    # --- Telegram ---
+    async def telegram(self, mensaje):
+        # Sin credenciales no se encola: el aviso no cuenta como enviado
+        if not _credenciales_telegram():
+            self.errores += 1
+            metricas.contar("errores", etapa="envio_telegram")
+            return
+        await self._encolar("telegram", mensaje, self._enviar_telegram, INTERVALO_TELEGRAM, TAMANO_COLA_NOTIFICACIONES, "envio_telegram")
+
+    async def _enviar_telegram(self, mensajes):
+        credenciales = _credenciales_telegram()
+        if not credenciales: return len(mensajes)
+        url, chat_id = credenciales
+        if self._sesion is None or self._sesion.closed:
+            self._sesion = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=TIMEOUT_TELEGRAM))
+
+        for texto in _trozos_telegram(mensajes):
+            payload = {"chat_id": chat_id, "text": texto, "parse_mode": "Markdown"}
+            for intento in range(REINTENTOS_TELEGRAM):
+                async with self._sesion.post(url, json=payload) as respuesta:
+                    if respuesta.status != 429:
+                        respuesta.raise_for_status()
+                        break
+                    datos = await respuesta.json(content_type=None)
+                # 429: Telegram indica cuántos segundos esperar
+                await asyncio.sleep(float(datos.get("parameters", {}).get("retry_after", 1)))
+            else:
+                raise RuntimeError("Telegram sigue limitando los envíos")
+            await asyncio.sleep(INTERVALO_TELEGRAM)
+
+    # --- Ciclo de vida ---
+    async def vaciar(self):
+        """Espera a que salga todo lo encolado."""
+        await asyncio.gather(*(cola.join() for cola, _ in self._destinos.values()))
+
+    async def cerrar(self):
+        for _, tarea in self._destinos.values(): tarea.cancel()
+        self._destinos.clear()
+        if self._sesion is not None: await self._sesion.close()
+
+
+despachador = Despachador()
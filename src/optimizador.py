@@ -0,0 +1,111 @@
+import sys
+import random
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import pandas as pd
+from src.backtester import generar_senales, resolver_operaciones, metricas_cartera, HORIZONTE
+from src.strategy import PARAMETROS_ESTRATEGIA
+from src.motor_evaluacion import MAX_PROCESOS, CONTEXTO_PROCESOS
+
+# ==========================================================
+# 🧬 OPTIMIZADOR DE PARÁMETROS (GRID / RANDOM SEARCH)
+# ==========================================================
+# Cada configuración se evalúa con el backtester vectorizado en un pool de
+# procesos. Los indicadores de todo el universo van en un solo bloque de memoria
+# compartida: los workers lo leen sin que se pickleen DataFrames por tarea.
+
+COLUMNAS_OPTIMIZADOR = ['High', 'Low', 'Close', 'RSI', 'EMA_9', 'EMA_21', 'EMA_50', 'SMA_200', 'ATR', 'prob']
+
+# Métricas donde gana el valor más bajo
+METRICAS_MENOR_ES_MEJOR = {"max_drawdown"}
+
+_bloque = None   # SharedMemory adjunta en el worker
+_datos = None    # {ticker: DataFrame (vista sobre la memoria compartida)}
+
+
+def _empaquetar(lotes, probabilidades):
+    """Apila los tickers en una sola matriz (filas × COLUMNAS_OPTIMIZADOR) y devuelve (matriz, tramos)."""
+    bloques, tramos, fila = [], {}, 0
+    for ticker, df in lotes.items():
+        matriz = np.full((len(df), len(COLUMNAS_OPTIMIZADOR)), np.nan)
+        for j, col in enumerate(COLUMNAS_OPTIMIZADOR[:-1]):
+            matriz[:, j] = df[col].to_numpy(dtype=float)
+        if ticker in probabilidades:
+            matriz[:, -1] = np.asarray(probabilidades[ticker], dtype=float)
+        bloques.append(matriz)
+        tramos[ticker] = (fila, fila + len(df))
+        fila += len(df)
+    return np.vstack(bloques), tramos
+
+
+def _adjuntar(nombre, forma, tramos):
+    """Inicializador del worker: abre la memoria compartida y arma vistas por ticker."""
+    global _bloque, _datos
+    # El bloque es del proceso principal (él lo libera): el worker no debe rastrearlo,
+    # o el resource_tracker avisa de fugas o lo borra antes de tiempo. Antes de 3.13 no
+    # existe track=False: se omite el registro mientras se adjunta (el tracker es
+    # compartido con el principal, así que des-registrar después borraría su entrada).
+    if sys.version_info >= (3, 13):
+        _bloque = shared_memory.SharedMemory(name=nombre, track=False)
+    else:
+        registrar = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try: _bloque = shared_memory.SharedMemory(name=nombre)
+        finally: resource_tracker.register = registrar
+    matriz = np.ndarray(forma, dtype=np.float64, buffer=_bloque.buf)
+    _datos = {t: pd.DataFrame(matriz[a:b], columns=COLUMNAS_OPTIMIZADOR, copy=False) for t, (a, b) in tramos.items()}
+
+
+def _evaluar_configuracion(estilo, parametros, horizonte):
+    operaciones = {}
+    for ticker, df in _datos.items():
+        prob = None if df['prob'].isna().all() else df['prob'].fillna(0.5)
+        operaciones[ticker] = resolver_operaciones(df, generar_senales(df, estilo, prob, parametros), horizonte)
+    # Una curva por ticker: sumar todas en una sola inflaría retorno y drawdown
+    return {**parametros, **metricas_cartera(operaciones)}
+
+
+def generar_configuraciones(rejilla, muestras=None, semilla=42):
+    """Producto cartesiano de la rejilla; con `muestras` toma una muestra aleatoria de él."""
+    nombres = list(rejilla)
+    todas = [dict(zip(nombres, valores)) for valores in itertools.product(*(rejilla[n] for n in nombres))]
+    if muestras and muestras < len(todas):
+        todas = random.Random(semilla).sample(todas, muestras)
+    return todas
+
+
+def optimizar(lotes, rejilla, estilo="SWING", probabilidades=None, metrica="expectativa_R",
+              muestras=None, horizonte=None, max_procesos=MAX_PROCESOS, min_operaciones=20):
+    """
+    lotes: {ticker: DataFrame con indicadores}. rejilla: {parametro: [valores]} con claves
+    de PARAMETROS_ESTRATEGIA. Devuelve un DataFrame con una fila por configuración,
+    ordenado por `metrica` (las que tienen menos de `min_operaciones` van al final).
+    """
+    desconocidos = set(rejilla) - set(PARAMETROS_ESTRATEGIA)
+    if desconocidos: raise ValueError(f"Parámetros desconocidos: {sorted(desconocidos)}")
+    if not lotes: return pd.DataFrame()
+
+    horizonte = horizonte or HORIZONTE.get(estilo, HORIZONTE["SWING"])
+    configuraciones = generar_configuraciones(rejilla, muestras)
+    matriz, tramos = _empaquetar(lotes, probabilidades or {})
+
+    bloque = shared_memory.SharedMemory(create=True, size=matriz.nbytes)
+    try:
+        np.ndarray(matriz.shape, dtype=np.float64, buffer=bloque.buf)[:] = matriz
+        # Mismo arranque que el motor de evaluación: nada de fork desde un proceso con hilos
+        with ProcessPoolExecutor(max_workers=max_procesos, mp_context=multiprocessing.get_context(CONTEXTO_PROCESOS),
+                                 initializer=_adjuntar, initargs=(bloque.name, matriz.shape, tramos)) as pool:
+            futuros = [pool.submit(_evaluar_configuracion, estilo, c, horizonte) for c in configuraciones]
+            resultados = [f.result() for f in futuros]
+    finally:
+        bloque.close()
+        bloque.unlink()
+
+    tabla = pd.DataFrame(resultados)
+    ascendente = metrica in METRICAS_MENOR_ES_MEJOR
+    tabla["_suficiente"] = tabla["operaciones"] >= min_operaciones
+    tabla = tabla.sort_values(["_suficiente", metrica], ascending=[False, ascendente], na_position='last')
+    return tabla.drop(columns="_suficiente").reset_index(drop=True)
@@ -0,0 +1,94 @@
+import os
+import re
+import time
+import hashlib
+import tempfile
+from collections import OrderedDict
+import joblib
+
+# --- REGISTRO DE MODELOS ENTRENADOS ---
+# Entrenar el RandomForest es lo más caro de cada señal. Guardamos los modelos
+# por (ticker, estilo, columnas) y solo reentrenamos cuando hay suficientes velas
+# nuevas o el modelo ya está viejo.
+DIRECTORIO_MODELOS = os.getenv("CACHE_MODELOS", os.path.join("cache", "modelos"))
+CAPACIDAD_MODELOS = int(os.getenv("CAPACIDAD_MODELOS", "128"))
+MIN_VELAS_NUEVAS = int(os.getenv("MIN_VELAS_NUEVAS", "8"))
+MAX_EDAD_MODELO = float(os.getenv("MAX_EDAD_MODELO", str(6 * 3600)))
+
+
+class RegistroModelos:
+    def __init__(self, directorio=None, capacidad=CAPACIDAD_MODELOS,
+                 min_velas_nuevas=MIN_VELAS_NUEVAS, max_edad=MAX_EDAD_MODELO):
+        self.directorio = directorio or DIRECTORIO_MODELOS
+        self.capacidad = capacidad
+        self.min_velas_nuevas = min_velas_nuevas
+        self.max_edad = max_edad
+        self._modelos = OrderedDict()  # clave -> {"predictor", "ultima_vela", "entrenado_en"}
+        self.aciertos = 0
+        self.entrenamientos = 0
+
+    def _ruta(self, clave):
+        ticker, estilo, columnas = clave
+        firma = hashlib.md5(",".join(columnas).encode()).hexdigest()[:8]
+        nombre = re.sub(r"[^A-Za-z0-9._-]", "_", f"{ticker}_{estilo}_{firma}")
+        return os.path.join(self.directorio, f"{nombre}.joblib")
+
+    def _leer_disco(self, clave):
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta): return None
+        try: return joblib.load(ruta)
+        except Exception as e:
+            print(f"⚠️ Modelo en disco ilegible ({ruta}): {e}")
+            return None
+
+    def _guardar_disco(self, clave, entrada):
+        ruta = self._ruta(clave)
+        temporal = None
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            # Temporal único: varios procesos del pool pueden guardar el mismo modelo a la vez
+            with tempfile.NamedTemporaryFile(dir=self.directorio, suffix=".tmp", delete=False) as f:
+                temporal = f.name
+                joblib.dump(entrada, f)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el modelo {clave[0]}: {e}")
+            if temporal and os.path.exists(temporal): os.remove(temporal)
+
+    def _recordar(self, clave, entrada):
+        self._modelos[clave] = entrada
+        self._modelos.move_to_end(clave)
+        while len(self._modelos) > self.capacidad:
+            self._modelos.popitem(last=False)
+
+    def _vigente(self, entrada, datos):
+        if time.time() - entrada["entrenado_en"] > self.max_edad: return False
+        velas_nuevas = int((datos.index > entrada["ultima_vela"]).sum())
+        return velas_nuevas < self.min_velas_nuevas
+
+    def obtener(self, ticker, estilo, columnas, datos, fabrica):
+        """
+        Devuelve un predictor entrenado para `datos` (histórico sin la vela en vivo).
+        `fabrica` crea un predictor nuevo con métodos entrenar() y el atributo entrenado.
+        """
+        clave = (ticker, estilo, tuple(columnas))
+
+        entrada = self._modelos.get(clave)
+        if entrada is None:
+            entrada = self._leer_disco(clave)
+
+        if entrada is not None and self._vigente(entrada, datos):
+            self.aciertos += 1
+            self._recordar(clave, entrada)
+            return entrada["predictor"]
+
+        predictor = fabrica()
+        predictor.entrenar(datos)
+        self.entrenamientos += 1
+        if not predictor.entrenado:
+            return predictor
+
+        entrada = {"predictor": predictor, "ultima_vela": datos.index[-1], "entrenado_en": time.time()}
+        self._recordar(clave, entrada)
+        self._guardar_disco(clave, entrada)
+        return predictor
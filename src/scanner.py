@@ -1,69 +1,110 @@
+import os
+import warnings
+import numpy as np
 import pandas as pd
-import yfinance as yf
 import asyncio
+from src.data_loader import obtener_barras, armar_panel
+from src.indicadores import alinear_por_posicion, ema
+from src.metricas import metricas
+from src.universo import universo
 
 # --- EL MEGA-UNIVERSO DE ACTIVOS ---
-UNIVERSO = {
-    "FOREX": [
-        # Majors
-        'EURUSD=X', 'GBPUSD=X', 'JPY=X', 'AUDUSD=X', 'NZDUSD=X', 'USDCAD=X', 'USDCHF=X',
-        # Cruces y Exóticos
-        'EURGBP=X', 'EURJPY=X', 'GBPJPY=X', 'AUDJPY=X', 'CHFJPY=X', 'EURAUD=X',
-        # Latinos
-        'COP=X', 'MXN=X', 'BRL=X', 'CLP=X', 'PEN=X'
-    ],
-    "CRIPTO": [
-        # Top Market Cap
-        'BTC-USD', 'ETH-USD', 'BNB-USD', 'SOL-USD', 'XRP-USD', 'ADA-USD', 'DOGE-USD',
-        'AVAX-USD', 'TRX-USD', 'DOT-USD', 'LINK-USD', 'MATIC-USD', 'SHIB-USD', 'LTC-USD',
-        'UNI-USD', 'ATOM-USD', 'XLM-USD', 'NEAR-USD', 'ALGO-USD', 'APE-USD', 'SAND-USD'
-    ],
-    "ACCIONES": [
-        # Tech Gigantes (Magnificent 7)
-        'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'TSLA', 'META',
-        # Populares y Volátiles
-        'NFLX', 'AMD', 'INTC', 'PYPL', 'COIN', 'UBER', 'ABNB', 'SHOP', 'SQ', 'ROKU',
-        # ETFs Inversos y Apalancados
-        'SQQQ', 'TQQQ', 'SOXL', 'SOXS', 'LABU', 'LABD',
-        # Latinos
-        'NU', 'MELI', 'ECOPETROL.CN'
-    ],
-    "GENERAL": [
-        'BTC-USD', 'ETH-USD', 'EURUSD=X', 'GBPUSD=X', 'AAPL', 'NVDA', 'TSLA', 'COP=X', 'XRP-USD'
-    ]
-}
+# Viene del maestro de instrumentos (UNIVERSO_ARCHIVO): {categoría: [tickers]}
+UNIVERSO = universo.categorias
+# Tickers por petición a Yahoo: las categorías grandes se piden en tandas concurrentes
+LOTE_PROVEEDOR = int(os.getenv("LOTE_PROVEEDOR", "200"))
 
-async def escanear_mercado(categoria="GENERAL", estilo="SCALPING"):
+# --- PREFILTRO VECTORIZADO (ETAPA 1 DEL SCANNER) ---
+# Puntajes baratos calculados sobre el panel completo (velas × tickers) de una vez.
+# Cada uno se pasa a percentil dentro del universo y se promedian; solo los K mejores
+# llegan al análisis completo (etapa 2: examinar_activo).
+MOVIMIENTO_MINIMO = 0.002   # 0.2% en 3 velas: descarta "monedas muertas"
+HORIZONTES = (3, 12, 48)    # velas de los retornos multi-horizonte
+TOP_K = int(os.getenv("TOP_K_SCANNER", "10"))
+K_MINIMO = int(os.getenv("K_MINIMO_SCANNER", "3"))
+K_MAXIMO = int(os.getenv("K_MAXIMO_SCANNER", "40"))
+# Estimado de examinar_activo hasta que las métricas tengan mediciones reales
+SEGUNDOS_POR_EVALUACION = float(os.getenv("SEGUNDOS_POR_EVALUACION", "1.0"))
+PUNTAJES = [f"mov_{h}" for h in HORIZONTES] + ["mov_atr", "volumen", "dist_ema"]
+
+
+def _en(matriz, atras):
+    """Fila `atras` velas antes de la última (NaN si la historia no alcanza)."""
+    return matriz[-1 - atras] if len(matriz) > atras else np.full(matriz.shape[1], np.nan)
+
+
+def puntajes_prefiltro(barras):
+    """
+    {ticker: OHLCV} -> DataFrame (ticker × puntajes) con 'puntaje' en [0, 1] y 'elegible'.
+    Un ticker es elegible si tiene más de 5 velas y se movió más de MOVIMIENTO_MINIMO en 3.
+    """
+    if not barras: return pd.DataFrame(columns=PUNTAJES + ["puntaje", "elegible"])
+    paneles = alinear_por_posicion(barras, ['High', 'Low', 'Close', 'Volume'])
+    close = paneles['Close'].ffill()
+    c, h, l = close.to_numpy(), paneles['High'].ffill().to_numpy(), paneles['Low'].ffill().to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # columnas todo-NaN (sin volumen / sin historia)
+        cierre_previo = np.vstack([np.full((1, c.shape[1]), np.nan), c[:-1]])
+        rango = np.fmax(h - l, np.fmax(np.abs(h - cierre_previo), np.abs(l - cierre_previo)))
+        atr = np.nanmean(rango[-14:], axis=0)
+        atr[atr == 0] = np.nan
+
+        tabla = pd.DataFrame(index=close.columns)
+        for horizonte in HORIZONTES:
+            tabla[f"mov_{horizonte}"] = np.abs(c[-1] / _en(c, horizonte) - 1)
+        tabla["mov_atr"] = np.abs(c[-1] - _en(c, 3)) / atr
+        if 'Volume' in paneles:
+            # Forex no trae volumen (0): queda NaN y no suma ni resta
+            v = paneles['Volume'].to_numpy()
+            base = np.nanmedian(np.where(v[-21:-1] > 0, v[-21:-1], np.nan), axis=0) if len(v) > 1 else np.nan
+            tabla["volumen"] = v[-1] / base
+        else:
+            tabla["volumen"] = np.nan
+        tabla["dist_ema"] = np.abs(c[-1] - ema(close, 21).to_numpy()[-1]) / atr
+
+    tabla = tabla.replace([np.inf, -np.inf], np.nan)
+    tabla["puntaje"] = tabla[PUNTAJES].rank(pct=True).fillna(0).mean(axis=1)
+    tabla["elegible"] = (close.notna().sum().to_numpy() > 5) & (tabla["mov_3"] > MOVIMIENTO_MINIMO)
+    return tabla
+
+
+def k_por_presupuesto(segundos, paralelismo=1):
+    """Cuántos candidatos alcanzan a evaluarse en `segundos`, según lo que viene tardando examinar_activo."""
+    por_ticker = metricas.promedio("latencia_segundos", etapa="examinar_activo") or SEGUNDOS_POR_EVALUACION
+    return int(np.clip(segundos * paralelismo / por_ticker, K_MINIMO, K_MAXIMO))
+
+
+@metricas.medir("escanear_mercado")
+async def escanear_mercado(categoria="GENERAL", estilo="SCALPING", devolver_panel=False, k=None):
     """
     Escanea listas grandes buscando volatilidad.
+    Rankea todo el universo con el prefiltro vectorizado y devuelve los `k` mejores
+    (TOP_K por defecto; el radar lo ajusta con k_por_presupuesto).
+    Con devolver_panel=True retorna (candidatos, panel), donde el panel OHLCV de los
+    candidatos se pasa a descargar_lote para no volver a descargarlos.
     """
-    lista = UNIVERSO.get(categoria, UNIVERSO["GENERAL"])
+    lista = universo.tickers(categoria)
     inter, per = ("15m", "5d") if estilo == "SCALPING" else ("1d", "6mo")
     
     try:
         # Descarga masiva (Optimizado)
-        # yfinance descarga todo de una vez, es rápido aunque la lista sea larga
-        datos = yf.download(lista, period=per, interval=inter, progress=False, auto_adjust=True)['Close']
-        
-        if isinstance(datos, pd.Series): datos = datos.to_frame()
-        
-        candidatos = []
-        for ticker in lista:
-            if ticker in datos.columns:
-                precios = datos[ticker].dropna()
-                
-                if len(precios) > 5:
-                    # Filtro de Volatilidad:
-                    # Solo nos interesan activos que se hayan movido al menos un 0.2% recientemente
-                    # Así evitamos que el bot te recomiende "monedas muertas"
-                    volatilidad = abs((precios.iloc[-1] - precios.iloc[-4]) / precios.iloc[-4])
-                    
-                    if volatilidad > 0.002: 
-                        candidatos.append(ticker)
-                    
-        # Retornamos hasta 10 candidatos para tener variedad
-        return candidatos[:10]
+        # Una petición por tanda de LOTE_PROVEEDOR tickers y solo de las velas que no estén en caché
+        partes = await asyncio.gather(*(obtener_barras(lote, per, inter) for lote in universo.lotes(categoria, LOTE_PROVEEDOR)))
+        barras = {t: df for parte in partes for t, df in parte.items()}
+        barras = {t: barras[t] for t in lista if t in barras}
+
+        # Filtro de Volatilidad + ranking: los más movidos primero (empates en orden de la lista)
+        tabla = puntajes_prefiltro(barras)
+        elegibles = tabla[tabla["elegible"]].sort_values("puntaje", ascending=False, kind="stable")
+        candidatos = elegibles.index[:k or TOP_K].tolist()
+        metricas.contar("prefiltro", len(barras), resultado="evaluado")
+        metricas.contar("prefiltro", len(candidatos), resultado="aprobado")
+
+        if devolver_panel:
+            return candidatos, armar_panel({t: barras[t] for t in candidatos}, per, inter)
+        return candidatos
         
     except Exception as e:
         print(f"Error scanner: {e}")
-        return lista[:5]
+        return (lista[:5], None) if devolver_panel else lista[:5]
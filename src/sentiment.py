@@ -1,58 +1,117 @@
-from gnews import GNews
+import os
+import json
+import asyncio
+import hashlib
+import threading
 from textblob import TextBlob
-import time
+from src.cache_ttl import CacheTTL
+from src.metricas import metricas
 
-def analizar_sentimiento(ticker):
-    """
-    Busca noticias en Google News sobre el Ticker y calcula el sentimiento.
-    Retorna entre -1 (Negativo) y 1 (Positivo).
-    """
-    print(f"📰 Consultando Google News para {ticker}...")
-    
-    try:
+# --- FUENTES DE NOTICIAS ---
+# Google News para producción; FuenteLocal lee un fixture JSON ({ticker: [{"title", "url"}]})
+# para probar sin red. SENTIMIENTO_FIXTURE=ruta activa la fuente local.
+TTL_SENTIMIENTO = float(os.getenv("TTL_SENTIMIENTO", "1800"))  # segundos que vale el puntaje de un ticker
+MAX_SENTIMIENTO = int(os.getenv("MAX_SENTIMIENTO", "8"))        # consultas de noticias simultáneas
+
+class FuenteGoogleNews:
+    def __init__(self, max_results=5):
+        from gnews import GNews  # solo hace falta si se usa Google News
         # Configuramos Google News (en inglés para mejor análisis de TextBlob)
-        google_news = GNews(language='en', country='US', period='1d', max_results=5)
-        
-        # Buscamos noticias del ticker (ej. "Nubank stock", "Apple stock")
+        self.cliente = GNews(language='en', country='US', period='1d', max_results=max_results)
+
+    def buscar(self, ticker):
         # Añadimos 'stock' para evitar noticias de productos (ej. "Nuevo iPhone")
-        query = f"{ticker} stock"
-        noticias = google_news.get_news(query)
-        
+        return self.cliente.get_news(f"{ticker} stock") or []
+
+
+class FuenteLocal:
+    def __init__(self, fixture):
+        if isinstance(fixture, str):
+            with open(fixture, encoding="utf-8") as f: fixture = json.load(f)
+        self.noticias = fixture
+
+    def buscar(self, ticker):
+        return self.noticias.get(ticker, [])
+
+
+def _fuente_por_defecto():
+    ruta = os.getenv("SENTIMIENTO_FIXTURE")
+    return FuenteLocal(ruta) if ruta else FuenteGoogleNews()
+
+
+def _limpiar_titulo(titulo):
+    # A veces el título trae el nombre del diario al final " - Reuters"
+    if "-" in titulo:
+        titulo = "-".join(titulo.split("-")[:-1])
+    return titulo
+
+
+class ServicioSentimiento:
+    """
+    Puntaje de sentimiento por ticker entre -1 (Negativo) y 1 (Positivo).
+    Cada titular se puntúa una sola vez (cache por hash de url/título) y el
+    puntaje del ticker se reutiliza durante `ttl` segundos.
+    """
+    def __init__(self, fuente=None, ttl=TTL_SENTIMIENTO, max_concurrentes=MAX_SENTIMIENTO):
+        self._fuente = fuente
+        self._candado = threading.Lock()  # las caches se comparten entre hilos
+        self.puntajes_ticker = CacheTTL(capacidad=2000, ttl=ttl)
+        self.titulares = CacheTTL(capacidad=20000, ttl=7 * 86400)
+        self.max_concurrentes = max_concurrentes
+
+    @property
+    def fuente(self):
+        if self._fuente is None: self._fuente = _fuente_por_defecto()
+        return self._fuente
+
+    def _polaridad(self, articulo):
+        titulo = articulo.get('title', '')
+        clave = hashlib.sha1((articulo.get('url') or titulo).encode("utf-8")).hexdigest()
+        with self._candado: polaridad = self.titulares.obtener(clave)
+        if polaridad is None:
+            polaridad = TextBlob(_limpiar_titulo(titulo)).sentiment.polarity
+            with self._candado: self.titulares.guardar(clave, polaridad)
+        return polaridad
+
+    def puntuar(self, ticker):
+        """Versión síncrona para un ticker (usa las mismas caches)."""
+        with self._candado: guardado = self.puntajes_ticker.obtener(ticker)
+        if guardado is not None: return guardado
+
+        try:
+            noticias = self.fuente.buscar(ticker)
+        except Exception as e:
+            print(f"   ❌ Error en módulo de noticias ({ticker}): {e}")
+            return 0.0
         if not noticias:
             print(f"   ⚠️ No se encontraron noticias recientes para {ticker}.")
-            return 0.0
 
-        suma_polaridad = 0
-        contador = 0
-
-        print(f"   found {len(noticias)} articles. Analizando...")
-
-        for articulo in noticias:
-            # GNews garantiza que siempre hay un 'title'
-            titulo = articulo.get('title', '')
-            
-            # Limpieza básica: A veces el título trae el nombre del diario al final " - Reuters"
-            if "-" in titulo:
-                titulo = titulo.split("-")[:-1] # Quitamos la fuente
-                titulo = "-".join(titulo)
-            
-            # Análisis de sentimiento
-            analysis = TextBlob(titulo)
-            polaridad = analysis.sentiment.polarity
-            
-            # Solo contamos si el sentimiento no es neutro (para evitar ruido)
-            if polaridad != 0:
-                suma_polaridad += polaridad
-                contador += 1
-                # Descomenta esta línea si quieres ver qué está leyendo
-                # print(f"     🗣️ {titulo[:30]}... -> {polaridad:.2f}")
-
-        if contador == 0:
-            return 0.0
+        # Solo contamos si el sentimiento no es neutro (para evitar ruido)
+        polaridades = [p for p in (self._polaridad(a) for a in noticias) if p != 0]
+        puntaje = sum(polaridades) / len(polaridades) if polaridades else 0.0
+        with self._candado: self.puntajes_ticker.guardar(ticker, puntaje)
+        return puntaje
+
+    async def puntajes(self, tickers):
+        """{ticker: puntaje} consultando las fuentes de varios tickers a la vez."""
+        limite = asyncio.Semaphore(self.max_concurrentes)
+
+        async def uno(ticker):
+            async with limite:
+                return ticker, await asyncio.to_thread(self.puntuar, ticker)
 
-        promedio = suma_polaridad / contador
-        return promedio
+        return dict(await asyncio.gather(*(uno(t) for t in tickers)))
 
-    except Exception as e:
-        print(f"   ❌ Error en módulo de noticias: {e}")
-        return 0.0
+
+servicio = ServicioSentimiento()
+metricas.registrar_cache("sentimiento_ticker", servicio.puntajes_ticker)
+metricas.registrar_cache("sentimiento_titulares", servicio.titulares)
+
+
+def analizar_sentimiento(ticker):
+    """
+    Busca noticias en Google News sobre el Ticker y calcula el sentimiento.
+    Retorna entre -1 (Negativo) y 1 (Positivo).
+    """
+    print(f"📰 Consultando sentimiento para {ticker}...")
+    return servicio.puntuar(ticker)
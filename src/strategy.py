@@ -1,6 +1,28 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
+from src.registro_modelos import RegistroModelos
+from src.indicadores import ema
+
+COLUMNAS_MODELO = ['RSI', 'MACD', 'Signal', 'EMA_9', 'EMA_21', 'SMA_200', 'Volatilidad']
+
+# Umbrales de las reglas de entrada. El backtester y el optimizador leen los mismos
+PARAMETROS_ESTRATEGIA = {
+    "prob_largo_scalping": 0.55,
+    "prob_corto_scalping": 0.45,
+    "rsi_max_scalping": 70,
+    "rsi_min_scalping": 30,
+    "ratio_scalping": 1.5,
+    "prob_largo_swing": 0.65,
+    "prob_corto_swing": 0.35,
+    "rsi_max_swing": 65,
+    "rsi_min_swing": 35,
+    "atr_sl": 2.0,
+    "atr_tp": 4.0,
+}
+
+# Modelos ya entrenados, compartidos entre rondas del radar y análisis manuales
+registro = RegistroModelos()
 
 class Predictor:
     def __init__(self):
@@ -9,36 +31,56 @@ class Predictor:
 
     def entrenar(self, data):
         if data is None or len(data) < 50: return
-        cols = [f for f in ['RSI', 'MACD', 'Signal', 'EMA_9', 'EMA_21', 'SMA_200', 'Volatilidad'] if f in data.columns]
+        cols = [f for f in COLUMNAS_MODELO if f in data.columns]
         try:
             self.model.fit(data[cols], data['Target'])
             self.entrenado = True
         except: self.entrenado = False
 
+    def predecir_lote(self, data):
+        """
+        Clase y probabilidad alcista de todas las filas de `data` con un solo predict_proba
+        (la clase sale de las mismas probabilidades, el bosque se recorre una vez).
+        Sirve para puntuar una historia completa de una sola vez.
+        """
+        n = len(data)
+        clases = list(self.model.classes_) if self.entrenado else []
+        # Sin entrenar o con una sola clase en el target el modelo no opina: neutral (50%)
+        if len(clases) < 2: return np.zeros(n, dtype=int), np.full(n, 0.5)
+        cols = [f for f in COLUMNAS_MODELO if f in data.columns]
+        proba = self.model.predict_proba(data[cols])
+        clase = np.asarray(clases)[proba.argmax(axis=1)]
+        return clase, proba[:, clases.index(1)]
+
     def predecir_mañana(self, data):
         if not self.entrenado: return 0, 0.5
         try:
-            cols = [f for f in ['RSI', 'MACD', 'Signal', 'EMA_9', 'EMA_21', 'SMA_200', 'Volatilidad'] if f in data.columns]
-            return self.model.predict(data[cols].iloc[[-1]])[0], self.model.predict_proba(data[cols].iloc[[-1]])[0][1]
+            clase, prob = self.predecir_lote(data.iloc[[-1]])
+            return clase[0], prob[0]
         except: return 0, 0.5
 
-def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL"):
+def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL", parametros=None):
     if df is None or df.empty: return None, 0.0
+    p = {**PARAMETROS_ESTRATEGIA, **(parametros or {})}
 
     # 1. CÁLCULO DE INDICADORES
-    df['EMA_9'] = df['Close'].ewm(span=9, adjust=False).mean()
-    df['EMA_21'] = df['Close'].ewm(span=21, adjust=False).mean()
-    df['SMA_200'] = df['Close'].rolling(window=200).mean()
-    df['EMA_50'] = df['Close'].ewm(span=50, adjust=False).mean()
+    # data_loader ya los trae del motor de indicadores; solo se calculan si faltan
+    if not all(c in df.columns for c in ['EMA_9', 'EMA_21', 'SMA_200', 'EMA_50']):
+        df['EMA_9'] = ema(df['Close'], 9)
+        df['EMA_21'] = ema(df['Close'], 21)
+        df['SMA_200'] = df['Close'].rolling(window=200).mean()
+        df['EMA_50'] = ema(df['Close'], 50)
     
     # --- CORRECCIÓN PANDAS (MODERNO) ---
-    df = df.bfill() # Reemplaza al antiguo fillna(method='bfill')
+    # data_loader ya entrega el frame relleno: solo se copia si de verdad hay huecos
+    if df.isna().to_numpy().any():
+        df = df.bfill() # Reemplaza al antiguo fillna(method='bfill')
 
     # 2. IA
     prob = 0.5
     if len(df) > 210:
-        brain = Predictor()
-        brain.entrenar(df.iloc[:-1])
+        cols = [f for f in COLUMNAS_MODELO if f in df.columns]
+        brain = registro.obtener(ticker, estilo, cols, df.iloc[:-1], Predictor)
         _, prob = brain.predecir_mañana(df)
     
     row = df.iloc[-1]
@@ -61,11 +103,11 @@ def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL"):
 
     # === LÓGICA SCALPING ===
     if estilo == "SCALPING":
-        ratio = 1.5
+        ratio = p["ratio_scalping"]
         ema_9 = row['EMA_9']
         ema_21 = row['EMA_21']
 
-        if prob > 0.55 and ema_9 > ema_21 and precio > ema_9 and rsi < 70:
+        if prob > p["prob_largo_scalping"] and ema_9 > ema_21 and precio > ema_9 and rsi < p["rsi_max_scalping"]:
             sl = min_reciente
             if (precio - sl) < (precio * 0.0005): sl = precio * 0.9995
             riesgo = precio - sl
@@ -76,7 +118,7 @@ def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL"):
             veredicto = "SCALPING LONG ⚡"
             motivo = f"Momentum (EMA 9>21) ({prob*100:.0f}%)"
 
-        elif prob < 0.45 and ema_9 < ema_21 and precio < ema_9 and rsi > 30:
+        elif prob < p["prob_corto_scalping"] and ema_9 < ema_21 and precio < ema_9 and rsi > p["rsi_min_scalping"]:
             sl = max_reciente
             if (sl - precio) < (precio * 0.0005): sl = precio * 1.0005
             riesgo = sl - precio
@@ -91,10 +133,10 @@ def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL"):
     elif estilo == "SWING":
         sma_200 = row['SMA_200']
         ema_50 = row['EMA_50']
-        sl_dist = atr * 2.0
-        tp_dist = atr * 4.0
+        sl_dist = atr * p["atr_sl"]
+        tp_dist = atr * p["atr_tp"]
 
-        if prob > 0.65 and precio > sma_200 and precio > ema_50 and rsi < 65:
+        if prob > p["prob_largo_swing"] and precio > sma_200 and precio > ema_50 and rsi < p["rsi_max_swing"]:
             sl = precio - sl_dist
             tp = precio + tp_dist
             tipo = "LONG (COMPRA)"
@@ -103,7 +145,7 @@ def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL"):
             veredicto = "OPORTUNIDAD DE ORO 🚀"
             motivo = f"Tendencia Mayor Alcista ({prob*100:.0f}%)"
 
-        elif prob < 0.35 and precio < sma_200 and precio < ema_50 and rsi > 35:
+        elif prob < p["prob_corto_swing"] and precio < sma_200 and precio < ema_50 and rsi > p["rsi_min_swing"]:
             sl = precio + sl_dist
             tp = precio - tp_dist
             tipo = "SHORT (VENTA)"
@@ -121,20 +163,15 @@ def examinar_activo(df, ticker, estilo="SCALPING", categoria="GENERAL"):
     elif categoria == "FOREX": etiqueta = "FOR"
     elif categoria == "ACCIONES": etiqueta = "ACC"
 
-    nombre_broker = ticker.replace("-USD", "USD").replace("=X", "")
-    if "JPY" in ticker: fmt = ",.3f"
-    elif any(x in ticker for x in ["COP", "CLP"]): fmt = ",.0f"
-    elif precio < 0.001: fmt = ",.8f"
-    elif precio < 1.0: fmt = ",.4f"
-    else: fmt = ",.4f" if precio < 50 else ",.2f"
-
+    # Números crudos: el formato (decimales según el tick) se aplica recién al mostrarlos
     info = {
-        "ticker": nombre_broker,
+        "ticker": ticker.replace("-USD", "USD").replace("=X", ""),
+        "simbolo": ticker,
         "mercado": etiqueta,
-        "precio": format(precio, fmt),
-        "sl": format(sl, fmt),
-        "tp": format(tp, fmt),
-        "rsi": f"{rsi:.1f}",
+        "precio": float(precio),
+        "sl": float(sl),
+        "tp": float(tp),
+        "rsi": float(rsi),
         "señal": señal,
         "icono": icono,
         "veredicto": veredicto,
@@ -0,0 +1,90 @@
+import os
+import csv
+import json
+import sqlite3
+
+# --- MAESTRO DE INSTRUMENTOS ---
+# El universo vive en un archivo (CSV, JSON o SQLite) en vez de en el código.
+# Columnas: ticker, categorias (separadas por "|"), alias ("|"), broker (símbolo en
+# el exchange, vacío si no se opera) y tick (precisión de precio, vacío si no se sabe).
+# Cada categoría conserva el orden de las filas del archivo: el scanner recorta por ese orden.
+# La ruta por defecto es relativa al repo, no al directorio desde donde se lanza el bot.
+ARCHIVO_UNIVERSO = os.getenv("UNIVERSO_ARCHIVO", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "universo.csv"))
+CAMPOS = ("ticker", "categorias", "alias", "broker", "tick")
+
+
+def _lista(valor):
+    if valor is None: return []
+    if isinstance(valor, (list, tuple)): return [str(v).strip() for v in valor if str(v).strip()]
+    return [v.strip() for v in str(valor).split("|") if v.strip()]
+
+
+def _leer_filas(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".csv":
+        with open(ruta, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    if extension == ".json":
+        with open(ruta, encoding="utf-8") as f: datos = json.load(f)
+        return datos.get("instrumentos", []) if isinstance(datos, dict) else datos
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        with sqlite3.connect(ruta) as conexion:
+            conexion.row_factory = sqlite3.Row
+            return [dict(fila) for fila in conexion.execute(f"SELECT {', '.join(CAMPOS)} FROM instrumentos")]
+    raise ValueError(f"Formato de universo no soportado: {ruta}")
+
+
+class Universo:
+    def __init__(self, filas=()):
+        self.categorias = {}  # categoría -> [tickers] en el orden del archivo
+        self.alias = {}       # ALIAS -> ticker
+        self.broker = {}      # ticker -> símbolo del broker
+        self.tick = {}        # ticker -> precisión de precio
+        self._categorias_de = {}  # ticker -> [categorías]
+        for fila in filas: self.agregar(**{c: fila.get(c) for c in CAMPOS})
+
+    @classmethod
+    def desde_archivo(cls, ruta=None):
+        return cls(_leer_filas(ruta or ARCHIVO_UNIVERSO))
+
+    def agregar(self, ticker, categorias=None, alias=None, broker=None, tick=None):
+        ticker = str(ticker).strip().upper()
+        if not ticker: return
+        for cat in _lista(categorias):
+            miembros = self.categorias.setdefault(cat, [])
+            if ticker not in miembros:
+                miembros.append(ticker)
+                self._categorias_de.setdefault(ticker, []).append(cat)
+        for a in _lista(alias): self.alias[a.upper()] = ticker
+        if broker: self.broker[ticker] = str(broker).strip()
+        if tick not in (None, ""): self.tick[ticker] = float(tick)
+
+    # --- Consultas ---
+    def normalizar(self, ticker):
+        if not ticker: return None
+        ticker = ticker.upper().strip()
+        return self.alias.get(ticker, ticker)
+
+    def tickers(self, categoria="GENERAL"):
+        return self.categorias.get(categoria, self.categorias.get("GENERAL", []))
+
+    def categorias_de(self, ticker):
+        return self._categorias_de.get(ticker, [])
+
+    def simbolo_broker(self, ticker):
+        return self.broker.get(ticker)
+
+    def lotes(self, categoria="GENERAL", tamano=200):
+        """Tickers de la categoría en tandas de `tamano` (límite por petición del proveedor)."""
+        lista = self.tickers(categoria)
+        for i in range(0, len(lista), max(1, tamano)):
+            yield lista[i:i + tamano]
+
+    def __contains__(self, ticker):
+        return ticker in self._categorias_de or ticker in self.broker or ticker in self.tick
+
+    def __len__(self):
+        return len(self._categorias_de)
+
+
+universo = Universo.desde_archivo()
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Las pruebas corren desde cualquier directorio y nunca escriben en la cache real
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path: sys.path.insert(0, RAIZ)
+_TEMPORAL = tempfile.mkdtemp(prefix="pruebas_cazador_")
+for variable, nombre in (("CACHE_MODELOS", "modelos"), ("CACHE_BARRAS", "barras"),
+                         ("CACHE_INSTRUMENTOS", "instrumentos.json"), ("CACHE_NOTICIAS", "noticias_rss.json")):
+    os.environ.setdefault(variable, os.path.join(_TEMPORAL, nombre))
+
+from benchmarks.fixtures import generar_velas
+
+
+@pytest.fixture
+def velas():
+    """Velas OHLCV sintéticas y reproducibles: velas(ticker, intervalo)."""
+    return generar_velas
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import src.strategy as strategy
+from src.data_loader import calcular_indicadores
+from src.backtester import generar_senales, resolver_operaciones, CALENTAMIENTO, HORIZONTE
+
+
+class PredictorFijo:
+    """Sustituye al RandomForest: devuelve la probabilidad prefijada de la última vela."""
+    def __init__(self, probs):
+        self.probs = probs
+
+    def predecir_mañana(self, df):
+        return 1, self.probs[len(df) - 1]
+
+
+@pytest.fixture
+def historia(velas):
+    return calcular_indicadores(velas("BTC-USD", "1h"), compacto=False)
+
+
+@pytest.fixture
+def probs(historia):
+    return np.random.default_rng(3).uniform(0.2, 0.8, len(historia))
+
+
+@pytest.mark.parametrize("estilo", ["SCALPING", "SWING"])
+def test_senales_igual_a_examinar_activo(historia, probs, estilo, monkeypatch):
+    monkeypatch.setattr(strategy.registro, "obtener", lambda *args, **kwargs: PredictorFijo(probs))
+    senales = generar_senales(historia, estilo, probs)
+    direcciones = {"LONG (COMPRA)": 1, "SHORT (VENTA)": -1, "NEUTRAL": 0}
+
+    # examinar_activo solo consulta el modelo con más de 210 velas
+    for i in range(CALENTAMIENTO + 11, len(historia), 7):
+        info, _ = strategy.examinar_activo(historia.iloc[:i + 1], "BTC-USD", estilo)
+        esperada = senales.iloc[i]
+        assert direcciones[info["tipo_operacion"]] == esperada["direccion"]
+        if esperada["direccion"]:
+            assert info["sl"] == pytest.approx(esperada["sl"])
+            assert info["tp"] == pytest.approx(esperada["tp"])
+    assert (senales["direccion"] != 0).any()
+
+
+@pytest.mark.parametrize("estilo", ["SCALPING", "SWING"])
+def test_operaciones_sin_solapamiento(historia, probs, estilo):
+    operaciones = resolver_operaciones(historia, generar_senales(historia, estilo, probs), HORIZONTE[estilo])
+    assert len(operaciones) > 1
+    barras = historia.index.get_indexer(operaciones["fecha"])
+    assert (barras[1:] >= barras[:-1] + operaciones["velas"].to_numpy()[:-1]).all()
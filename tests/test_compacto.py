@@ -0,0 +1,21 @@
+import numpy as np
+from src.data_loader import calcular_indicadores
+from src.indicadores import indicadores_panel
+
+
+def test_compacto_float32_igual_a_float64(velas):
+    df = velas("NVDA", "1h")
+    normal = calcular_indicadores(df.copy(), compacto=False)
+    compacto = calcular_indicadores(df.copy(), compacto=True)
+    assert (compacto.dtypes == np.float32).all()
+    assert list(compacto.columns) == list(normal.columns)
+    np.testing.assert_allclose(compacto.to_numpy(dtype=float), normal.to_numpy(dtype=float), rtol=1e-5)
+
+
+def test_panel_compacto_igual_al_normal(velas):
+    barras = {t: velas(t, "15m") for t in ("BTC-USD", "MSFT")}
+    barras["MSFT"] = barras["MSFT"].iloc[50:]
+    normal, compacto = indicadores_panel(barras), indicadores_panel(barras, compacto=True)
+    for t in barras:
+        assert compacto[t].to_numpy().dtype == np.float32
+        np.testing.assert_allclose(compacto[t].to_numpy(dtype=float), normal[t].to_numpy(dtype=float), rtol=1e-5)
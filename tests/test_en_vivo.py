@@ -0,0 +1,36 @@
+import pytest
+from src.indicadores import EstadoIndicadores, IndicadoresEnVivo, verificar_estado
+
+
+def test_estado_incremental_igual_al_lote(velas):
+    df = velas("ETH-USD", "15m")
+    assert verificar_estado(EstadoIndicadores.desde_historia(df), df) == {}
+
+
+def test_estado_incremental_con_vela_en_formacion(velas):
+    df = velas("ETH-USD", "15m")
+    estado = EstadoIndicadores.desde_historia(df.iloc[:300])
+    for fecha, (high, low, close) in zip(df.index[300:], df[['High', 'Low', 'Close']].to_numpy()[300:]):
+        estado.actualizar(fecha, high * 1.01, low * 0.99, close * 1.005)  # versión a medio formar
+        estado.actualizar(fecha, high, low, close)
+    assert verificar_estado(estado, df) == {}
+
+
+@pytest.mark.parametrize("ventana", [210, 400])
+def test_en_vivo_no_reconstruye_con_historia_recortada(velas, ventana):
+    # Como obtener_barras: cada refresco trae solo las últimas `ventana` velas
+    df = velas("ETH-USD", "1h")
+    en_vivo = IndicadoresEnVivo(verificar_cada=5)
+    for i in range(ventana, len(df)):
+        en_vivo.sincronizar("ETH-USD", "1h", df.iloc[i - ventana:i + 1])
+    assert en_vivo.reconstrucciones == 0
+
+
+def test_en_vivo_reconstruye_si_se_desvia(velas):
+    df = velas("SOL-USD", "15m")
+    en_vivo = IndicadoresEnVivo(verificar_cada=20)
+    en_vivo.sincronizar("SOL-USD", "15m", df.iloc[:400])
+    en_vivo._estados[("SOL-USD", "15m")].sma_200.suma += 1e6
+    valores = en_vivo.sincronizar("SOL-USD", "15m", df.iloc[:430])
+    assert en_vivo.reconstrucciones == 1
+    assert valores["SMA_200"] == pytest.approx(df['Close'].iloc[230:430].mean())
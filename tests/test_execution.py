@@ -0,0 +1,50 @@
+import asyncio
+import ccxt
+import pytest
+from src.execution import BrokerAsync, ExchangeSimulado
+
+
+class ExchangeQueCorta(ExchangeSimulado):
+    """La orden llega al exchange pero la respuesta se pierde `cortes` veces."""
+    def __init__(self, cortes=1, **kwargs):
+        super().__init__(**kwargs)
+        self.cortes = cortes
+
+    async def create_market_order(self, symbol, side, amount, price=None, params=None):
+        orden = await super().create_market_order(symbol, side, amount, price, params)
+        if self.cortes:
+            self.cortes -= 1
+            raise ccxt.NetworkError("conexión cortada")
+        return orden
+
+
+def _broker(exchange, velas):
+    exchange.cargar_velas("BTC/USDT", velas("BTC-USD", "15m"))
+    return BrokerAsync(exchange, espera=0)
+
+
+def test_reintento_duplicado_recupera_la_orden_original(velas):
+    broker = _broker(ExchangeQueCorta(), velas)
+    orden = asyncio.run(broker.crear_orden_mercado("BTC/USDT", "buy", 1, {"clientOrderId": "abc"}))
+    assert orden["clientOrderId"] == "abc"
+    assert len(broker.exchange._ordenes) == 1
+    assert not broker.latencias
+
+
+def test_duplicado_sin_falla_de_red_previa_se_propaga(velas):
+    broker = _broker(ExchangeSimulado(), velas)
+    asyncio.run(broker.crear_orden_mercado("BTC/USDT", "buy", 1, {"clientOrderId": "abc"}))
+    with pytest.raises(ccxt.DuplicateOrderId):
+        asyncio.run(broker.crear_orden_mercado("BTC/USDT", "buy", 1, {"clientOrderId": "abc"}))
+    assert len(broker.latencias) == 1
+
+
+def test_otro_rechazo_tras_falla_de_red_se_propaga(velas):
+    class Rechaza(ExchangeQueCorta):
+        async def create_market_order(self, symbol, side, amount, price=None, params=None):
+            if not self.cortes: raise ccxt.InsufficientFunds("sin saldo")
+            return await super().create_market_order(symbol, side, amount, price, params)
+
+    broker = _broker(Rechaza(), velas)
+    with pytest.raises(ccxt.InsufficientFunds):
+        asyncio.run(broker.crear_orden_mercado("BTC/USDT", "buy", 1, {"clientOrderId": "abc"}))
@@ -0,0 +1,14 @@
+import pandas as pd
+from src.data_loader import calcular_indicadores
+from src.indicadores import indicadores_panel
+
+
+def test_panel_igual_a_calcular_indicadores(velas):
+    # Largos distintos: el panel alinea por la última vela
+    barras = {"BTC-USD": velas("BTC-USD", "15m"), "AAPL": velas("AAPL", "15m").iloc[100:],
+              "EURUSD=X": velas("EURUSD=X", "15m").iloc[:-30]}
+    panel = indicadores_panel(barras)
+    assert set(panel) == set(barras)
+    for ticker, df in barras.items():
+        pd.testing.assert_frame_equal(panel[ticker], calcular_indicadores(df.copy(), compacto=False),
+                                      check_dtype=False, rtol=1e-9)
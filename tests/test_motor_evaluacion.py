@@ -0,0 +1,28 @@
+import asyncio
+import pytest
+from src import motor_evaluacion
+from src.data_loader import calcular_indicadores
+from src.strategy import examinar_activo
+
+
+@pytest.fixture
+def pool():
+    yield
+    if motor_evaluacion._pool_procesos is not None:
+        motor_evaluacion._pool_procesos.shutdown()
+        motor_evaluacion._pool_procesos = None
+
+
+def test_lote_entrega_lo_mismo_que_en_proceso(velas, pool):
+    trabajos = [(t, calcular_indicadores(velas(t, "1h")), estilo, "GENERAL")
+                for t in ("NVDA", "MSFT") for estilo in ("SCALPING", "SWING")]
+
+    async def juntar():
+        return [r async for r in motor_evaluacion.evaluar_lote(trabajos)]
+
+    resultados = asyncio.run(juntar())
+    assert len(resultados) == len(trabajos)
+    por_clave = {(t, e, c): (info, prob) for t, e, c, info, prob in resultados}
+    for ticker, df, estilo, categoria in trabajos:
+        info, prob = examinar_activo(df.copy(), ticker, estilo, categoria)
+        assert por_clave[(ticker, estilo, categoria)] == (info, pytest.approx(prob))
@@ -0,0 +1,24 @@
+import asyncio
+from src.notifications import Despachador
+
+
+def test_telegram_sin_credenciales_no_cuenta_como_enviado(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_TOKEN", raising=False)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+
+    async def probar():
+        despachador = Despachador(ventana=0)
+        await despachador.telegram("hola")
+        await despachador.vaciar()
+        await despachador.cerrar()
+        return despachador
+
+    despachador = asyncio.run(probar())
+    assert despachador.enviados == 0
+    assert despachador.errores == 1
+
+
+def test_telegram_credenciales_perdidas_en_cola_cuentan_como_fallidas(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_TOKEN", raising=False)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+    assert asyncio.run(Despachador()._enviar_telegram(["a", "b"])) == 2
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from src.data_loader import calcular_indicadores
+from src.indicadores import indicadores_panel
+from src.backtester import generar_senales, resolver_operaciones, metricas, metricas_cartera, HORIZONTE
+from src.optimizador import optimizar
+
+
+def test_metricas_cartera_no_suma_curvas(velas):
+    historia = calcular_indicadores(velas("BTC-USD", "1h"), compacto=False)
+    probs = np.random.default_rng(3).uniform(0.2, 0.8, len(historia))
+    operaciones = resolver_operaciones(historia, generar_senales(historia, "SWING", probs), HORIZONTE["SWING"])
+    individual = metricas(operaciones)
+    cartera = metricas_cartera({"A": operaciones, "B": operaciones.copy(), "C": operaciones.iloc[:0]})
+    assert cartera["operaciones"] == 2 * individual["operaciones"]
+    assert cartera["max_drawdown"] == pytest.approx(individual["max_drawdown"])
+    assert cartera["retorno_total"] == pytest.approx(individual["retorno_total"] * 2 / 3)
+    assert cartera["expectativa"] == pytest.approx(individual["expectativa"])
+
+
+def test_optimizar_igual_a_evaluar_en_el_proceso(velas):
+    lotes = indicadores_panel({t: velas(t, "1h") for t in ("BTC-USD", "AAPL")})
+    rejilla = {"atr_sl": [1.0, 2.0], "atr_tp": [3.0]}
+    tabla = optimizar(lotes, rejilla, max_procesos=2, min_operaciones=0)
+    assert len(tabla) == 2
+    for _, fila in tabla.iterrows():
+        parametros = {"atr_sl": fila["atr_sl"], "atr_tp": fila["atr_tp"]}
+        esperado = metricas_cartera({t: resolver_operaciones(df, generar_senales(df, "SWING", None, parametros), HORIZONTE["SWING"])
+                                     for t, df in lotes.items()})
+        assert fila["operaciones"] == esperado["operaciones"]
+        assert fila["retorno_total"] == pytest.approx(esperado["retorno_total"])
+        assert fila["max_drawdown"] == pytest.approx(esperado["max_drawdown"])
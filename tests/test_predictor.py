@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from src import model_handler, strategy
+from src.data_loader import calcular_indicadores
+
+
+@pytest.mark.parametrize("clase", [0, 1])
+@pytest.mark.parametrize("Predictor", [strategy.Predictor, model_handler.Predictor])
+def test_target_de_una_sola_clase_es_neutral(velas, Predictor, clase):
+    df = calcular_indicadores(velas("NVDA", "1h"))
+    df["Target"] = clase
+    brain = Predictor()
+    brain.entrenar(df)
+    predicciones, prob = brain.predecir_lote(df)
+    np.testing.assert_array_equal(prob, np.full(len(df), 0.5))
+    assert (predicciones == 0).all()
+    assert brain.predecir_mañana(df)[1] == 0.5
+
+
+@pytest.mark.parametrize("Predictor", [strategy.Predictor, model_handler.Predictor])
+def test_lote_igual_a_predict(velas, Predictor):
+    df = calcular_indicadores(velas("NVDA", "1h"))
+    df["Target"] = (df["Close"].shift(-1) > df["Close"]).astype(int)
+    brain = Predictor()
+    brain.entrenar(df)
+    cols = list(brain.model.feature_names_in_)
+    predicciones, prob = brain.predecir_lote(df)
+    np.testing.assert_array_equal(predicciones, brain.model.predict(df[cols]))
+    np.testing.assert_allclose(prob, brain.model.predict_proba(df[cols])[:, 1])